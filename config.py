@@ -1,17 +1,35 @@
 """
 config.py — Load config.yaml + .env into a single dict.
 """
+import logging
 import os
+import time
+
 import yaml
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Secrets from .env
 TELEGRAM_BOT_TOKEN: str = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 OPENAI_API_KEY: str = os.environ.get("OPENAI_API_KEY", "")
 
 _config_cache: dict | None = None
+# (st_mtime_ns, st_size) of config.yaml when _config_cache was parsed; the
+# size catches a rewrite within the filesystem's mtime granularity.
+_config_stamp: tuple[int, int] | None = None
+_config_checked_at: float = 0.0
+# telegram.operator_user_id of _config_cache, kept alongside it for the
+# per-command ACL checks.
+_operator_id: int | None = None
+# load() is called from every handler and scheduler tick; only stat
+# config.yaml for changes this often.
+_RECHECK_SECONDS = 2.0
+
+# libyaml's C loader when available; the pure-Python loader is much slower.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 _ENV_OVERRIDES = [
@@ -45,19 +63,51 @@ def _apply_env_overrides(config: dict) -> dict:
 
 
 def load() -> dict:
-    global _config_cache
-    if _config_cache is not None:
+    """Return the parsed config, re-reading config.yaml only when its mtime/size change."""
+    global _config_cache, _config_stamp, _config_checked_at, _operator_id
+    now = time.monotonic()
+    if _config_cache is not None and now - _config_checked_at < _RECHECK_SECONDS:
         return _config_cache
 
     config_path = os.environ.get("CONFIG_PATH", "./config.yaml")
-    with open(config_path, "r", encoding="utf-8") as f:
-        _config_cache = yaml.safe_load(f) or {}
+    _config_checked_at = now
+    stamp = None
+    try:
+        st = os.stat(config_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if _config_cache is not None and stamp == _config_stamp:
+            return _config_cache
 
-    _config_cache = _apply_env_overrides(_config_cache)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.load(f, Loader=_YAML_LOADER) or {}
+    except (OSError, yaml.YAMLError):
+        # A half-written edit or a file briefly missing mid-deploy shouldn't
+        # take every handler down while a good config is still in memory.
+        if _config_cache is None:
+            raise
+        logger.exception("Could not load %s; keeping the previous config.", config_path)
+        if stamp is not None:
+            _config_stamp = stamp  # don't retry until the file changes again
+        return _config_cache
+
+    _config_cache = _apply_env_overrides(config)
+    _config_stamp = stamp
+    _operator_id = (_config_cache.get("telegram") or {}).get("operator_user_id")
     return _config_cache
 
 
+def operator_id() -> int | None:
+    """telegram.operator_user_id from the current config (via load()), or None if unset."""
+    load()
+    return _operator_id
+
+
 def reload() -> dict:
+    """Drop the cached config and parse config.yaml again immediately."""
     global _config_cache
-    _config_cache = None
-    return load()
+    previous, _config_cache = _config_cache, None
+    try:
+        return load()
+    except Exception:
+        _config_cache = previous
+        raise
@@ -1,31 +1,130 @@
 """
 db.py — SQLite schema and all database queries for the TEM review bot.
 """
+import asyncio
+import functools
+import json
+import logging
+import queue
 import sqlite3
 import os
-from datetime import datetime, timedelta, timezone
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from contextlib import contextmanager
 
+logger = logging.getLogger(__name__)
+
+# Bind datetimes directly as ISO-8601 text — the same format the *.isoformat()
+# calls used to produce, so comparisons against already-stored rows still
+# work. (The stdlib default adapter is deprecated as of Python 3.12.)
+sqlite3.register_adapter(datetime, datetime.isoformat)
+
 DB_PATH = os.environ.get("DB_PATH", "./tem_bot.db")
 
+# Per-connection pragmas. journal_mode=WAL is persisted in the DB file by
+# init_db(); these settings are not, so they're applied on every connect.
+_CONN_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -64000",
+    # wal_autocheckpoint stays at SQLite's default (1000 pages). Commits run
+    # on the db.run() pool, so the occasional inline checkpoint doesn't block
+    # the event loop, and the WAL stays bounded even when the scheduler's
+    # checkpoint job isn't running (one-off scripts, a failing job).
+)
+
+
+# Idle connections are kept here and reused instead of reconnecting per query.
+# Handlers may run DB calls from worker threads, hence check_same_thread=False;
+# each connection is only ever held by one caller at a time.
+_POOL_SIZE = 8
+_POOL: queue.Queue = queue.Queue(maxsize=_POOL_SIZE)
+# Pooled connections live for the whole process, so a larger per-connection
+# statement cache keeps every query in this module compiled after first use.
+# The cache is keyed by exact SQL text, so statements issued from more than
+# one helper are shared as module constants (_SQL_*) rather than retyped.
+_CACHED_STATEMENTS = 256
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                           cached_statements=_CACHED_STATEMENTS)
+    conn.row_factory = sqlite3.Row
+    for pragma in _CONN_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# Every helper in this module blocks on SQLite I/O. Handlers on the asyncio
+# event loop call them as `await db.run(db.get_submission_by_id, sub_id)` so
+# other Telegram callbacks keep being served meanwhile. Sized to the pool, so
+# each worker can hold a pooled connection.
+_EXECUTOR = ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="db")
+
+
+async def run(fn, *args, **kwargs):
+    """Run a blocking db helper (or a function built from them) on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+
+# Bumped after every commit made through get_conn(), so callers can cache
+# derived results (e.g. the /status text) and notice any write since. Only
+# sees this process's writes — edits made with the sqlite3 CLI don't count.
+_write_version = 0
+_write_version_lock = threading.Lock()
+
+
+def write_version() -> int:
+    return _write_version
+
+
+def _bump_write_version():
+    global _write_version
+    with _write_version_lock:
+        _write_version += 1
+
 
 @contextmanager
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
+def get_conn(readonly: bool = False):
+    """
+    Borrow a pooled connection. Commits on success unless readonly=True —
+    pure SELECT helpers never open a write transaction, so there's nothing
+    to commit.
+    """
+    try:
+        conn = _POOL.get_nowait()
+    except queue.Empty:
+        conn = _connect()
     try:
         yield conn
-        conn.commit()
+        if not readonly:
+            conn.commit()
+            _bump_write_version()
     except Exception:
         conn.rollback()
         raise
     finally:
-        conn.close()
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
 
 
 def init_db():
     with get_conn() as conn:
+        # auto_vacuum only takes effect on a fresh DB (before the first table
+        # is created); on existing files it's a no-op until a full VACUUM.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL is persistent: once set, every later connection uses it, so
+        # readers no longer block behind the writer.
+        conn.execute("PRAGMA journal_mode = WAL")
+        had_rejection_seconds = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rejection_seconds'"
+        ).fetchone() is not None
         conn.executescript("""
             CREATE TABLE IF NOT EXISTS bot_state (
                 key TEXT PRIMARY KEY,
@@ -47,7 +146,9 @@ def init_db():
                 accepted_at TIMESTAMP,
                 rejected_at TIMESTAMP,
                 publish_date DATE,
-                tg_status_message_id INTEGER
+                tg_status_message_id INTEGER,
+                message_id_header TEXT,
+                reviewer_fallbacks TEXT
             );
 
             CREATE TABLE IF NOT EXISTS assignments (
@@ -83,12 +184,18 @@ def init_db():
                 submission_id INTEGER NOT NULL REFERENCES submissions(id),
                 proposed_by TEXT NOT NULL,
                 reason TEXT NOT NULL,
-                seconds TEXT NOT NULL DEFAULT '[]',
                 tg_proposal_message_id INTEGER,
                 proposed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (submission_id) REFERENCES submissions(id)
             );
 
+            CREATE TABLE IF NOT EXISTS rejection_seconds (
+                rejection_id INTEGER NOT NULL REFERENCES rejections(id),
+                username TEXT NOT NULL,
+                seconded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (rejection_id, username)
+            );
+
             CREATE TABLE IF NOT EXISTS content_requests (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 submission_id INTEGER UNIQUE NOT NULL REFERENCES submissions(id),
@@ -98,13 +205,18 @@ def init_db():
             );
 
             CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions(status);
-            CREATE INDEX IF NOT EXISTS idx_assignments_submission ON assignments(submission_id);
+            DROP INDEX IF EXISTS idx_assignments_submission;
+            CREATE INDEX IF NOT EXISTS idx_assignments_sub_status
+                ON assignments(submission_id, status);
             CREATE INDEX IF NOT EXISTS idx_followups_pending
                 ON followups(scheduled_at) WHERE sent_at IS NULL;
             CREATE INDEX IF NOT EXISTS idx_content_requests_deadline
                 ON content_requests(deadline);
-            CREATE INDEX IF NOT EXISTS idx_assignment_history_assigned_at
-                ON assignment_history(assigned_at);
+            DROP INDEX IF EXISTS idx_assignment_history_assigned_at;
+            CREATE INDEX IF NOT EXISTS idx_assignment_history_assigned_user
+                ON assignment_history(assigned_at, reviewer_tg_username);
+            CREATE INDEX IF NOT EXISTS idx_rejections_sub
+                ON rejections(submission_id, proposed_at DESC);
         """)
 
         # Additive migration: add article_content to existing content_requests
@@ -124,60 +236,242 @@ def init_db():
                 "kind TEXT NOT NULL DEFAULT 'review'"
             )
 
+        # One-time migration: copy the legacy JSON-encoded rejections.seconds
+        # lists into rejection_seconds. Only older databases have the column;
+        # it is left in place there but no longer read or written.
+        rejection_cols = {row[1] for row in conn.execute("PRAGMA table_info(rejections)")}
+        if not had_rejection_seconds and "seconds" in rejection_cols:
+            for row in conn.execute(
+                "SELECT id, seconds FROM rejections WHERE seconds != '[]'"
+            ).fetchall():
+                conn.executemany(
+                    "INSERT OR IGNORE INTO rejection_seconds (rejection_id, username) "
+                    "VALUES (?, ?)",
+                    [(row["id"], u) for u in json.loads(row["seconds"] or "[]")]
+                )
+
+        # Additive migration: store the original RFC Message-ID so replies
+        # don't need an extra Gmail fetch to thread correctly.
+        sub_cols = {row[1] for row in conn.execute("PRAGMA table_info(submissions)")}
+        if "message_id_header" not in sub_cols:
+            conn.execute("ALTER TABLE submissions ADD COLUMN message_id_header TEXT")
+        # Additive migration: ranked substitute reviewers from the LLM pick
+        # (JSON list), used on decline before asking the model again.
+        if "reviewer_fallbacks" not in sub_cols:
+            conn.execute("ALTER TABLE submissions ADD COLUMN reviewer_fallbacks TEXT")
+
+        _init_title_fts(conn)
+
+
+# Full-text index over submission titles. The trigram tokenizer (rather than
+# unicode61) is used because titles are mostly CJK, which unicode61 does not
+# split into words — trigram keeps substring semantics for any keyword of
+# 3+ characters. Shorter keywords, or SQLite builds without FTS5/trigram,
+# fall back to the LIKE scan.
+_FTS_MIN_KEYWORD_LEN = 3
+_fts_enabled = False
+
+
+def _init_title_fts(conn):
+    global _fts_enabled
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'submissions_fts'"
+    ).fetchone() is not None
+    try:
+        conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS submissions_fts USING fts5(
+                title, content='submissions', content_rowid='id',
+                tokenize='trigram'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS submissions_fts_ai
+            AFTER INSERT ON submissions BEGIN
+                INSERT INTO submissions_fts(rowid, title) VALUES (new.id, new.title);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS submissions_fts_ad
+            AFTER DELETE ON submissions BEGIN
+                INSERT INTO submissions_fts(submissions_fts, rowid, title)
+                VALUES ('delete', old.id, old.title);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS submissions_fts_au
+            AFTER UPDATE OF title ON submissions BEGIN
+                INSERT INTO submissions_fts(submissions_fts, rowid, title)
+                VALUES ('delete', old.id, old.title);
+                INSERT INTO submissions_fts(rowid, title) VALUES (new.id, new.title);
+            END;
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning("FTS5 title index unavailable, using LIKE search: %s", e)
+        _fts_enabled = False
+        return
+    if not existed:
+        # Index rows that predate the FTS table.
+        conn.execute("INSERT INTO submissions_fts(submissions_fts) VALUES ('rebuild')")
+    _fts_enabled = True
+
+
+def checkpoint() -> None:
+    """
+    Copy committed WAL frames back into the main DB file. Blocking (it
+    fsyncs), so callers on the event loop should use run().
+    PASSIVE never waits on readers or writers; frames still in use are
+    picked up by the next run.
+    """
+    with get_conn(readonly=True) as conn:
+        busy, log_frames, checkpointed = conn.execute(
+            "PRAGMA wal_checkpoint(PASSIVE)"
+        ).fetchone()
+    logger.debug("WAL checkpoint: %s/%s frames (busy=%s)",
+                 checkpointed, log_frames, busy)
+
 
 # ── Submissions ──────────────────────────────────────────────────────────────
 
+@contextmanager
+def transaction():
+    """
+    One connection and one commit for a group of writes. Use the *_on(conn, ...)
+    helpers inside so they share it instead of opening their own.
+    """
+    with get_conn() as conn:
+        yield conn
+
+
+def insert_submission_on(conn, gmail_message_id, gmail_thread_id, title,
+                         author_name, author_email, medium_url, email_subject,
+                         email_body, message_id_header=None) -> int | None:
+    """Insert on an existing connection. Returns None if gmail_message_id already exists."""
+    cur = conn.execute(
+        """INSERT INTO submissions
+           (gmail_message_id, gmail_thread_id, title, author_name,
+            author_email, medium_url, email_subject, email_body,
+            message_id_header)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(gmail_message_id) DO NOTHING""",
+        (gmail_message_id, gmail_thread_id, title, author_name,
+         author_email, medium_url, email_subject, email_body,
+         message_id_header)
+    )
+    return cur.lastrowid if cur.rowcount else None
+
+
 def insert_submission(gmail_message_id, gmail_thread_id, title, author_name,
-                      author_email, medium_url, email_subject, email_body) -> int:
+                      author_email, medium_url, email_subject, email_body,
+                      message_id_header=None) -> int | None:
     with get_conn() as conn:
-        cur = conn.execute(
-            """INSERT INTO submissions
-               (gmail_message_id, gmail_thread_id, title, author_name,
-                author_email, medium_url, email_subject, email_body)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (gmail_message_id, gmail_thread_id, title, author_name,
-             author_email, medium_url, email_subject, email_body)
+        return insert_submission_on(
+            conn, gmail_message_id, gmail_thread_id, title, author_name,
+            author_email, medium_url, email_subject, email_body,
+            message_id_header,
         )
-        return cur.lastrowid
+
+
+_SQL_SUBMISSION_BY_ID = "SELECT * FROM submissions WHERE id = ?"
 
 
 def get_submission_by_id(sub_id: int):
-    with get_conn() as conn:
-        return conn.execute(
-            "SELECT * FROM submissions WHERE id = ?", (sub_id,)
-        ).fetchone()
+    with get_conn(readonly=True) as conn:
+        return conn.execute(_SQL_SUBMISSION_BY_ID, (sub_id,)).fetchone()
 
 
 def get_submission_by_gmail_id(gmail_message_id: str):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             "SELECT * FROM submissions WHERE gmail_message_id = ?",
             (gmail_message_id,)
         ).fetchone()
 
 
+def get_submission_thread_ids() -> set[str]:
+    """Gmail thread IDs of every stored submission (used to skip known threads)."""
+    with get_conn(readonly=True) as conn:
+        return {
+            row[0] for row in conn.execute(
+                "SELECT gmail_thread_id FROM submissions WHERE gmail_thread_id IS NOT NULL"
+            )
+        }
+
+
 def get_submission_by_title_keyword(keyword: str):
-    with get_conn() as conn:
+    """Active submissions whose title contains keyword, case-insensitively."""
+    if _fts_enabled and len(keyword) >= _FTS_MIN_KEYWORD_LEN:
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        with get_conn(readonly=True) as conn:
+            return conn.execute(
+                """SELECT s.* FROM submissions_fts f
+                   JOIN submissions s ON s.id = f.rowid
+                   WHERE submissions_fts MATCH ?
+                   AND s.status NOT IN ('accepted', 'rejected', 'omitted')
+                   ORDER BY s.id""",
+                (phrase,)
+            ).fetchall()
+
+    # A leading-% LIKE can't use a B-tree index, so this path scans; it only
+    # serves keywords too short for the trigram index. LIKE already ignores
+    # ASCII case, which is all lower() folds, so no per-row lower(title).
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT * FROM submissions
-               WHERE lower(title) LIKE lower(?)
+               WHERE title LIKE ?
                AND status NOT IN ('accepted', 'rejected', 'omitted')""",
             (f"%{keyword}%",)
         ).fetchall()
 
 
 def get_active_submissions():
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             "SELECT * FROM submissions WHERE status IN ('assigning', 'under_review')"
         ).fetchall()
 
 
+def get_active_submissions_with_context() -> list[dict]:
+    """
+    Active submissions plus their assignments, fetched in one statement
+    instead of 1 + N per-submission lookups.
+
+    Only the columns /status shows are read (not e.g. email_body). Each dict
+    has id, title and status plus:
+        assignments — [(reviewer_tg_username, status), ...] in insert order
+    """
+    with get_conn(readonly=True) as conn:
+        rows = conn.execute(
+            """SELECT s.id, s.title, s.status,
+                      (SELECT json_group_array(json_array(a.reviewer_tg_username, a.status))
+                       FROM (SELECT reviewer_tg_username, status FROM assignments
+                             WHERE submission_id = s.id ORDER BY id) a
+                      ) AS assignments_json
+               FROM submissions s
+               WHERE s.status IN ('assigning', 'under_review')"""
+        ).fetchall()
+    result = []
+    for row in rows:
+        sub = dict(row)
+        # JSON rather than a delimited string: /override stores usernames as
+        # typed, so they may contain any separator.
+        sub["assignments"] = [
+            tuple(pair) for pair in json.loads(sub.pop("assignments_json"))
+        ]
+        result.append(sub)
+    return result
+
+
+def update_submission_status_on(conn, sub_id: int, status: str,
+                                from_status: str | None = None) -> bool:
+    """With from_status, only change a submission still in it. True if changed."""
+    cur = conn.execute(
+        """UPDATE submissions SET status = ?
+           WHERE id = ? AND (? IS NULL OR status = ?)""",
+        (status, sub_id, from_status, from_status)
+    )
+    return cur.rowcount > 0
+
+
 def update_submission_status(sub_id: int, status: str):
     with get_conn() as conn:
-        conn.execute(
-            "UPDATE submissions SET status = ? WHERE id = ?", (status, sub_id)
-        )
+        update_submission_status_on(conn, sub_id, status)
 
 
 def set_submission_accepted(sub_id: int, publish_date):
@@ -211,6 +505,11 @@ def delete_submission(sub_id: int) -> bool:
         ).fetchone() is not None
         if not existed:
             return False
+        conn.execute(
+            "DELETE FROM rejection_seconds WHERE rejection_id IN "
+            "(SELECT id FROM rejections WHERE submission_id = ?)",
+            (sub_id,)
+        )
         conn.execute("DELETE FROM rejections WHERE submission_id = ?", (sub_id,))
         conn.execute("DELETE FROM followups WHERE submission_id = ?", (sub_id,))
         conn.execute("DELETE FROM assignments WHERE submission_id = ?", (sub_id,))
@@ -228,6 +527,26 @@ def set_tg_status_message_id(sub_id: int, message_id: int):
         )
 
 
+def set_reviewer_fallbacks_on(conn, sub_id: int, usernames: list[str]):
+    conn.execute(
+        "UPDATE submissions SET reviewer_fallbacks = ? WHERE id = ?",
+        (json.dumps(usernames), sub_id)
+    )
+
+
+def set_reviewer_fallbacks(sub_id: int, usernames: list[str]):
+    with get_conn() as conn:
+        set_reviewer_fallbacks_on(conn, sub_id, usernames)
+
+
+def get_reviewer_fallbacks(sub_id: int) -> list[str]:
+    with get_conn(readonly=True) as conn:
+        row = conn.execute(
+            "SELECT reviewer_fallbacks FROM submissions WHERE id = ?", (sub_id,)
+        ).fetchone()
+    return json.loads(row[0]) if row and row[0] else []
+
+
 # ── Assignments ──────────────────────────────────────────────────────────────
 
 def _norm_username(u: str) -> str:
@@ -235,26 +554,59 @@ def _norm_username(u: str) -> str:
     return (u or "").strip().lstrip("@").lower()
 
 
+_SQL_INSERT_ASSIGNMENT = (
+    "INSERT INTO assignments (submission_id, reviewer_tg_username) VALUES (?, ?)"
+)
+_SQL_INSERT_ASSIGNMENT_HISTORY = (
+    "INSERT INTO assignment_history (submission_id, reviewer_tg_username) "
+    "VALUES (?, ?)"
+)
+_SQL_ASSIGNMENTS_FOR_SUBMISSION = "SELECT * FROM assignments WHERE submission_id = ?"
+
+
 def insert_assignment(submission_id: int, reviewer_tg_username: str) -> int:
     reviewer_tg_username = _norm_username(reviewer_tg_username)
     with get_conn() as conn:
         cur = conn.execute(
-            """INSERT INTO assignments (submission_id, reviewer_tg_username)
-               VALUES (?, ?)""",
-            (submission_id, reviewer_tg_username)
+            _SQL_INSERT_ASSIGNMENT, (submission_id, reviewer_tg_username)
         )
         # Also write to history for workload tracking
         conn.execute(
-            """INSERT INTO assignment_history (submission_id, reviewer_tg_username)
-               VALUES (?, ?)""",
-            (submission_id, reviewer_tg_username)
+            _SQL_INSERT_ASSIGNMENT_HISTORY, (submission_id, reviewer_tg_username)
         )
         return cur.lastrowid
 
 
+def bulk_insert_assignments_on(conn, submission_id: int, usernames: list[str]) -> None:
+    """Insert several assignments (plus their history rows) on an existing connection."""
+    rows = [(submission_id, _norm_username(u)) for u in usernames]
+    if not rows:
+        return
+    conn.executemany(_SQL_INSERT_ASSIGNMENT, rows)
+    conn.executemany(_SQL_INSERT_ASSIGNMENT_HISTORY, rows)
+
+
+def bulk_insert_assignments(submission_id: int, usernames: list[str]) -> None:
+    """Insert several assignments (plus their history rows) in one transaction."""
+    with get_conn() as conn:
+        bulk_insert_assignments_on(conn, submission_id, usernames)
+
+
+def get_submission_with_assignments(sub_id: int):
+    """
+    (submission row, [assignment rows]) read on one connection, or
+    (None, []) if the submission doesn't exist.
+    """
+    with get_conn(readonly=True) as conn:
+        sub = conn.execute(_SQL_SUBMISSION_BY_ID, (sub_id,)).fetchone()
+        if sub is None:
+            return None, []
+        return sub, get_assignments_for_submission_on(conn, sub_id)
+
+
 def get_assignment(submission_id: int, reviewer_tg_username: str):
     reviewer_tg_username = _norm_username(reviewer_tg_username)
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT * FROM assignments
                WHERE submission_id = ? AND reviewer_tg_username = ?
@@ -263,69 +615,95 @@ def get_assignment(submission_id: int, reviewer_tg_username: str):
         ).fetchone()
 
 
+def get_assignments_for_submission_on(conn, submission_id: int):
+    return conn.execute(
+        _SQL_ASSIGNMENTS_FOR_SUBMISSION, (submission_id,)
+    ).fetchall()
+
+
 def get_assignments_for_submission(submission_id: int):
-    with get_conn() as conn:
-        return conn.execute(
-            "SELECT * FROM assignments WHERE submission_id = ?", (submission_id,)
-        ).fetchall()
+    with get_conn(readonly=True) as conn:
+        return get_assignments_for_submission_on(conn, submission_id)
 
 
-def get_confirmed_reviewers(sub_id: int):
-    with get_conn() as conn:
+def count_assignment_states(sub_id: int) -> dict[str, int]:
+    """
+    {status: n} for the submission's assignments, with every status present
+    (0 if unused). Answered from idx_assignments_sub_status without reading
+    the rows.
+    """
+    counts = dict.fromkeys(("pending", "confirmed", "declined", "done"), 0)
+    with get_conn(readonly=True) as conn:
+        counts.update(conn.execute(
+            """SELECT status, COUNT(*) FROM assignments
+               WHERE submission_id = ? GROUP BY status""",
+            (sub_id,)
+        ).fetchall())
+    return counts
+
+
+def get_pending_reviewers(sub_id: int):
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT * FROM assignments
-               WHERE submission_id = ? AND status = 'confirmed'""",
+               WHERE submission_id = ? AND status = 'pending'""",
             (sub_id,)
         ).fetchall()
 
 
-def get_done_reviewers(sub_id: int):
-    with get_conn() as conn:
+def get_confirmed_reviewers(sub_id: int):
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT * FROM assignments
-               WHERE submission_id = ? AND status = 'done'""",
+               WHERE submission_id = ? AND status = 'confirmed'""",
             (sub_id,)
         ).fetchall()
 
 
 def update_assignment_status(submission_id: int, reviewer_tg_username: str,
-                              status: str, reviewer_tg_id: int = None):
+                              status: str, reviewer_tg_id: int = None,
+                              from_status: str | None = None) -> bool:
+    """
+    Set the reviewer's assignment status. With from_status, only rows still
+    in that status change, so concurrent callers can't both act on the same
+    transition. Returns True if any row changed.
+    """
     reviewer_tg_username = _norm_username(reviewer_tg_username)
     with get_conn() as conn:
-        if reviewer_tg_id is not None:
-            conn.execute(
-                """UPDATE assignments
-                   SET status = ?, responded_at = CURRENT_TIMESTAMP, reviewer_tg_id = ?
-                   WHERE submission_id = ? AND reviewer_tg_username = ?""",
-                (status, reviewer_tg_id, submission_id, reviewer_tg_username)
-            )
-        else:
-            conn.execute(
-                """UPDATE assignments
-                   SET status = ?, responded_at = CURRENT_TIMESTAMP
-                   WHERE submission_id = ? AND reviewer_tg_username = ?""",
-                (status, submission_id, reviewer_tg_username)
-            )
+        # COALESCE keeps the stored reviewer_tg_id when none is passed.
+        cur = conn.execute(
+            """UPDATE assignments
+               SET status = ?, responded_at = CURRENT_TIMESTAMP,
+                   reviewer_tg_id = COALESCE(?, reviewer_tg_id)
+               WHERE submission_id = ? AND reviewer_tg_username = ?
+                 AND (? IS NULL OR status = ?)""",
+            (status, reviewer_tg_id, submission_id, reviewer_tg_username,
+             from_status, from_status)
+        )
+        return cur.rowcount > 0
 
 
 def mark_assignment_done(submission_id: int, reviewer_tg_username: str,
                          reviewer_tg_id: int = None):
+    """
+    Mark the reviewer's assignments done. Returns the submission's
+    assignments as of the same transaction, or None if the reviewer had
+    nothing left to mark (already done, or not assigned) — so the caller can
+    decide the next transition without another read.
+    """
     reviewer_tg_username = _norm_username(reviewer_tg_username)
     with get_conn() as conn:
-        if reviewer_tg_id is not None:
-            conn.execute(
-                """UPDATE assignments
-                   SET status = 'done', done_at = CURRENT_TIMESTAMP, reviewer_tg_id = ?
-                   WHERE submission_id = ? AND reviewer_tg_username = ?""",
-                (reviewer_tg_id, submission_id, reviewer_tg_username)
-            )
-        else:
-            conn.execute(
-                """UPDATE assignments
-                   SET status = 'done', done_at = CURRENT_TIMESTAMP
-                   WHERE submission_id = ? AND reviewer_tg_username = ?""",
-                (submission_id, reviewer_tg_username)
-            )
+        cur = conn.execute(
+            """UPDATE assignments
+               SET status = 'done', done_at = CURRENT_TIMESTAMP,
+                   reviewer_tg_id = COALESCE(?, reviewer_tg_id)
+               WHERE submission_id = ? AND reviewer_tg_username = ?
+                 AND status != 'done'""",
+            (reviewer_tg_id, submission_id, reviewer_tg_username)
+        )
+        if cur.rowcount == 0:
+            return None
+        return get_assignments_for_submission_on(conn, submission_id)
 
 
 def delete_pending_assignment(submission_id: int, reviewer_tg_username: str) -> bool:
@@ -345,79 +723,107 @@ def delete_pending_assignment(submission_id: int, reviewer_tg_username: str) ->
         return cur.rowcount > 0
 
 
-def clear_pending_assignments(submission_id: int):
+def clear_pending_assignments_on(conn, submission_id: int):
     """Remove pending/declined assignments for operator override."""
+    conn.execute(
+        """DELETE FROM assignments
+           WHERE submission_id = ? AND status IN ('pending', 'declined')""",
+        (submission_id,)
+    )
+
+
+def clear_pending_assignments(submission_id: int):
     with get_conn() as conn:
-        conn.execute(
-            """DELETE FROM assignments
-               WHERE submission_id = ? AND status IN ('pending', 'declined')""",
-            (submission_id,)
-        )
+        clear_pending_assignments_on(conn, submission_id)
 
 
 # ── Follow-ups ───────────────────────────────────────────────────────────────
 
-def insert_followup(submission_id: int, scheduled_at: datetime,
-                    kind: str = "review"):
-    with get_conn() as conn:
-        conn.execute(
-            "INSERT INTO followups (submission_id, scheduled_at, kind) "
-            "VALUES (?, ?, ?)",
-            (submission_id, scheduled_at.isoformat(), kind)
-        )
+def schedule_followup_on(conn, submission_id: int, hours: float,
+                         kind: str = "review"):
+    """
+    Queue a follow-up `hours` from now. SQLite computes the due time, in the
+    same ISO-8601 UTC shape the datetime adapter binds, so it still compares
+    correctly against the `now` passed to get_pending_followups().
+    """
+    conn.execute(
+        "INSERT INTO followups (submission_id, scheduled_at, kind) "
+        "VALUES (?, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now', ?), ?)",
+        (submission_id, f"{round(hours * 3600):+d} seconds", kind)
+    )
 
 
 def get_pending_followups(now: datetime):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT f.*, s.title, s.status FROM followups f
                JOIN submissions s ON s.id = f.submission_id
                WHERE f.scheduled_at <= ? AND f.sent_at IS NULL
                AND s.status IN ('assigning', 'under_review')""",
-            (now.isoformat(),)
+            (now,)
         ).fetchall()
 
 
+def mark_followup_sent_on(conn, followup_id: int):
+    conn.execute(
+        "UPDATE followups SET sent_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (followup_id,)
+    )
+
+
 def mark_followup_sent(followup_id: int):
     with get_conn() as conn:
+        mark_followup_sent_on(conn, followup_id)
+
+
+def clear_unsent_followups_on(conn, submission_id: int, kind: str | None = None):
+    """Delete unsent follow-ups for a submission, optionally filtered by kind."""
+    if kind is None:
+        conn.execute(
+            "DELETE FROM followups WHERE submission_id = ? AND sent_at IS NULL",
+            (submission_id,)
+        )
+    else:
         conn.execute(
-            "UPDATE followups SET sent_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (followup_id,)
+            "DELETE FROM followups WHERE submission_id = ? "
+            "AND sent_at IS NULL AND kind = ?",
+            (submission_id, kind)
         )
 
 
 def clear_unsent_followups(submission_id: int, kind: str | None = None):
-    """Delete unsent follow-ups for a submission, optionally filtered by kind."""
     with get_conn() as conn:
-        if kind is None:
-            conn.execute(
-                "DELETE FROM followups WHERE submission_id = ? AND sent_at IS NULL",
-                (submission_id,)
-            )
-        else:
-            conn.execute(
-                "DELETE FROM followups WHERE submission_id = ? "
-                "AND sent_at IS NULL AND kind = ?",
-                (submission_id, kind)
-            )
+        clear_unsent_followups_on(conn, submission_id, kind)
 
 
 # ── Assignment History ───────────────────────────────────────────────────────
 
-def get_recent_assignment_history(days: int = 90):
-    with get_conn() as conn:
-        # assigned_at is SQLite's CURRENT_TIMESTAMP (UTC, "YYYY-MM-DD HH:MM:SS").
-        # Match that format so string comparison works.
-        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+def get_recent_assignment_history(days: int = 90, limit: int = 10):
+    """Newest `limit` assignment_history rows from the last `days` days, with titles."""
+    with get_conn(readonly=True) as conn:
+        # assigned_at is SQLite's CURRENT_TIMESTAMP (UTC, "YYYY-MM-DD HH:MM:SS");
+        # datetime('now', ...) yields the same format, so string comparison works.
         return conn.execute(
             """SELECT ah.*, s.title FROM assignment_history ah
                LEFT JOIN submissions s ON s.id = ah.submission_id
-               WHERE ah.assigned_at >= ?
-               ORDER BY ah.assigned_at DESC""",
-            (cutoff,)
+               WHERE ah.assigned_at >= datetime('now', ?)
+               ORDER BY ah.assigned_at DESC
+               LIMIT ?""",
+            (f"-{days} days", limit)
+        ).fetchall()
+
+
+def get_workload_counts(days: int = 90) -> list[tuple[str, int]]:
+    """(username, assignment count) over the last `days` days, sorted by username."""
+    with get_conn(readonly=True) as conn:
+        rows = conn.execute(
+            """SELECT reviewer_tg_username, COUNT(*) FROM assignment_history
+               WHERE assigned_at >= datetime('now', ?)
+               GROUP BY reviewer_tg_username
+               ORDER BY reviewer_tg_username""",
+            (f"-{days} days",)
         ).fetchall()
+        return [(r[0], r[1]) for r in rows]
 
 
 # ── Rejections ───────────────────────────────────────────────────────────────
@@ -436,7 +842,7 @@ def insert_rejection(submission_id: int, proposed_by: str, reason: str,
 
 
 def get_active_rejection(submission_id: int):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             """SELECT * FROM rejections WHERE submission_id = ?
                ORDER BY proposed_at DESC LIMIT 1""",
@@ -444,21 +850,21 @@ def get_active_rejection(submission_id: int):
         ).fetchone()
 
 
-def add_second_to_rejection(rejection_id: int, username: str):
-    import json
+def add_second_to_rejection(rejection_id: int, username: str) -> list[str]:
+    """Record a second (idempotent). Returns all seconders in the order they seconded."""
     username = _norm_username(username)
     with get_conn() as conn:
-        row = conn.execute(
-            "SELECT seconds FROM rejections WHERE id = ?", (rejection_id,)
-        ).fetchone()
-        seconds = json.loads(row["seconds"]) if row else []
-        if username not in seconds:
-            seconds.append(username)
         conn.execute(
-            "UPDATE rejections SET seconds = ? WHERE id = ?",
-            (json.dumps(seconds), rejection_id)
+            "INSERT OR IGNORE INTO rejection_seconds (rejection_id, username) "
+            "VALUES (?, ?)",
+            (rejection_id, username)
         )
-        return seconds
+        rows = conn.execute(
+            """SELECT username FROM rejection_seconds WHERE rejection_id = ?
+               ORDER BY seconded_at, rowid""",
+            (rejection_id,)
+        ).fetchall()
+        return [row["username"] for row in rows]
 
 
 def set_rejection_proposal_message_id(rejection_id: int, message_id: int):
@@ -471,60 +877,69 @@ def set_rejection_proposal_message_id(rejection_id: int, message_id: int):
 
 # ── Content Requests ─────────────────────────────────────────────────────────
 
-def insert_content_request(submission_id: int, deadline: datetime):
-    with get_conn() as conn:
-        conn.execute(
-            "INSERT INTO content_requests (submission_id, deadline) VALUES (?, ?)",
-            (submission_id, deadline.isoformat())
-        )
+def insert_content_request_on(conn, submission_id: int, deadline: datetime):
+    conn.execute(
+        "INSERT INTO content_requests (submission_id, deadline) VALUES (?, ?)",
+        (submission_id, deadline)
+    )
 
 
 def get_expired_content_requests(now: datetime):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         return conn.execute(
             "SELECT * FROM content_requests WHERE deadline <= ?",
-            (now.isoformat(),)
+            (now,)
         ).fetchall()
 
 
+def delete_content_request_on(conn, submission_id: int):
+    conn.execute(
+        "DELETE FROM content_requests WHERE submission_id = ?",
+        (submission_id,)
+    )
+
+
 def delete_content_request(submission_id: int):
     with get_conn() as conn:
-        conn.execute(
-            "DELETE FROM content_requests WHERE submission_id = ?",
-            (submission_id,)
-        )
+        delete_content_request_on(conn, submission_id)
 
 
-def has_content_request(submission_id: int) -> bool:
-    with get_conn() as conn:
+def get_submission_content_state(submission_id: int):
+    """Return (exists, status, has_request, title) for a submission in one read."""
+    with get_conn(readonly=True) as conn:
         row = conn.execute(
-            "SELECT id FROM content_requests WHERE submission_id = ?",
+            """SELECT s.status, s.title, cr.id IS NOT NULL AS has_request
+               FROM submissions s
+               LEFT JOIN content_requests cr ON cr.submission_id = s.id
+               WHERE s.id = ?""",
             (submission_id,)
         ).fetchone()
-        return row is not None
+        if row is None:
+            return False, None, False, None
+        return True, row["status"], bool(row["has_request"]), row["title"]
 
 
 def append_content_request_text(submission_id: int, chunk: str) -> int:
-    """Append text to the buffered article content. Returns new total length."""
+    """
+    Append text to the buffered article content. Returns the new total
+    length, or 0 if there is no content request (e.g. it timed out or was
+    skipped meanwhile). One statement, so nothing can delete the row between
+    reading and writing it.
+    """
     with get_conn() as conn:
         row = conn.execute(
-            "SELECT article_content FROM content_requests WHERE submission_id = ?",
-            (submission_id,)
+            """UPDATE content_requests
+               SET article_content = CASE WHEN article_content = '' THEN ?
+                                          ELSE article_content || char(10, 10) || ? END
+               WHERE submission_id = ?
+               RETURNING length(article_content)""",
+            (chunk, chunk, submission_id)
         ).fetchone()
-        if row is None:
-            return 0
-        current = row["article_content"] or ""
-        separator = "\n\n" if current else ""
-        new_content = current + separator + chunk
-        conn.execute(
-            "UPDATE content_requests SET article_content = ? WHERE submission_id = ?",
-            (new_content, submission_id)
-        )
-        return len(new_content)
+        return row[0] if row else 0
 
 
 def get_content_request_text(submission_id: int) -> str:
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         row = conn.execute(
             "SELECT article_content FROM content_requests WHERE submission_id = ?",
             (submission_id,)
@@ -535,13 +950,18 @@ def get_content_request_text(submission_id: int) -> str:
 # ── Bot State (persistent key-value) ─────────────────────────────────────────
 
 def get_state(key: str, default=None):
-    with get_conn() as conn:
+    with get_conn(readonly=True) as conn:
         row = conn.execute(
             "SELECT value FROM bot_state WHERE key = ?", (key,)
         ).fetchone()
         return row["value"] if row else default
 
 
+def delete_state(key: str):
+    with get_conn() as conn:
+        conn.execute("DELETE FROM bot_state WHERE key = ?", (key,))
+
+
 def set_state(key: str, value: str):
     with get_conn() as conn:
         conn.execute(
@@ -1,11 +1,15 @@
 """
 gmail_client.py — Gmail OAuth setup, polling, email parsing, and sending.
 """
-import base64
+import binascii
 import email as email_lib
+import functools
+import html
 import logging
 import os
 import re
+import threading
+from collections import deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -23,6 +27,31 @@ SCOPES = ["https://www.googleapis.com/auth/gmail.modify"]
 
 _MEDIUM_URL_RE = re.compile(r"https?://(?:www\.)?medium\.com/[^\s\"'>]+")
 _REPLY_SUBJECT_RE = re.compile(r"^(Re|Fwd|FW|RE|FWD):\s*", re.IGNORECASE)
+_FROM_HEADER_RE = re.compile(r'"?([^"<]+)"?\s*<([^>]+)>')
+_FROM_BARE_RE = re.compile(r"[\w.+-]+@[\w.-]+")
+_HTML_DROP_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<br\s*/?>|</(p|div|li|tr|h[1-6])\s*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*\n+")
+
+# Partial-response masks: only request the fields we actually read.
+# A bare `parts` selects the whole (arbitrarily deep) subtree, so nested
+# multiparts are still returned in full below the first level.
+_LIST_FIELDS = "messages(id,threadId),nextPageToken"
+_HISTORY_FIELDS = (
+    "history(messagesAdded/message/id,labelsAdded(labelIds,message/id)),"
+    "historyId,nextPageToken"
+)
+_MESSAGE_FIELDS = (
+    "id,threadId,"
+    "payload(headers,mimeType,body/data,parts(mimeType,body/data,parts))"
+)
+
+# Gmail rejects batches over 100 requests and recommends at most 50.
+_BATCH_LIMIT = 50
+
+# Gmail label name → label ID, filled on first lookup.
+_label_id_cache: dict[str, str] = {}
 
 DEFAULT_EMAIL_TEMPLATES = {
     "under_review": (
@@ -59,6 +88,34 @@ def _render_template(name: str, default: str, **values) -> str:
         return default.format(**values)
 
 
+# The cached Gmail service wraps a single httplib2.Http, which is not
+# thread-safe. Polls and author emails run in worker threads and can
+# overlap, so every public API operation holds this lock.
+_service_lock = threading.Lock()
+
+
+def _serialized(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with _service_lock:
+            return method(*args, **kwargs)
+    return wrapper
+
+
+_client: "GmailClient | None" = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> "GmailClient":
+    """Process-wide GmailClient, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GmailClient()
+    return _client
+
+
 class GmailClient:
     def __init__(self):
         credentials_path = os.environ.get(
@@ -71,14 +128,109 @@ class GmailClient:
 
     # ── Polling ───────────────────────────────────────────────────────────────
 
+    @_serialized
     def poll_new_submissions(self, last_checked_timestamp: float,
                              subject_prefix: str = None,
-                             submission_label: str = None) -> list[dict]:
+                             submission_label: str = None,
+                             known_thread_ids: set[str] | None = None,
+                             start_history_id: str | None = None,
+                             ) -> tuple[list[dict], str | None]:
         """
-        Query Gmail for messages received after last_checked_timestamp (Unix epoch).
+        Fetch new submission emails.
+
+        With start_history_id, asks the Gmail history API for just the messages
+        added since that cursor. Without one (first run), or if Gmail reports
+        the cursor as expired, falls back to searching for messages received
+        after last_checked_timestamp (Unix epoch).
         Filters by subject_prefix and/or submission_label when provided.
-        Returns list of parsed submission dicts, skipping replies/threads.
+
+        Returns (submissions, history_id): parsed submission dicts, skipping
+        replies and messages in threads listed in known_thread_ids, plus the
+        cursor to pass on the next poll (None if it couldn't be determined).
         """
+        known_thread_ids = known_thread_ids or set()
+        message_ids = None
+        history_id = None
+
+        if start_history_id:
+            try:
+                message_ids, history_id = self._list_history_message_ids(
+                    start_history_id, submission_label
+                )
+            except HttpError as e:
+                if e.resp.status != 404:
+                    logger.error("Gmail API error listing history: %s", e)
+                    return [], None
+                logger.warning(
+                    "Gmail history cursor %s expired; falling back to search.",
+                    start_history_id,
+                )
+
+        if message_ids is None:
+            try:
+                # Read the cursor before searching so anything arriving in
+                # between is picked up by the next history poll.
+                history_id = (
+                    self.service.users()
+                    .getProfile(userId="me", fields="historyId")
+                    .execute()
+                    .get("historyId")
+                )
+                message_ids = self._search_message_ids(
+                    last_checked_timestamp, subject_prefix, submission_label
+                )
+            except HttpError as e:
+                logger.error("Gmail API error listing messages: %s", e)
+                return [], None
+            # The search query already applied the subject filter.
+            subject_prefix = None
+
+        if not message_ids:
+            return [], history_id
+
+        users = self.service.users()
+        try:
+            # One batched round-trip for every messages.get instead of N.
+            fetched = self._batch_execute({
+                message_id: users.messages().get(
+                    userId="me", id=message_id, format="full", fields=_MESSAGE_FIELDS
+                )
+                for message_id in message_ids
+            })
+        except HttpError as e:
+            logger.error("Gmail API error fetching messages: %s", e)
+            return [], None
+
+        submissions = []
+        for message_id in message_ids:
+            msg = fetched.get(message_id)
+            if msg is None:
+                continue
+            headers = _headers_of(msg)
+            subject = headers.get("subject", "")
+            logger.info("Checking message %s: subject=%r", message_id, subject)
+            if subject_prefix and subject_prefix.lower() not in subject.lower():
+                logger.info("  → skipped (subject does not match)")
+                continue
+            # Skip replies — if In-Reply-To header is present it's part of a thread
+            if "in-reply-to" in headers:
+                logger.info("  → skipped (is a reply)")
+                continue
+            # Skip threads we've already ingested (e.g. the bot has replied in
+            # them). Checked against the DB instead of a threads.get per message.
+            if msg.get("threadId", message_id) in known_thread_ids:
+                logger.info("  → skipped (thread already processed)")
+                continue
+            try:
+                submissions.append(_parse_message(message_id, msg, headers))
+            except Exception as e:
+                logger.error("Error processing message %s: %s", message_id, e)
+
+        return submissions, history_id
+
+    def _search_message_ids(self, last_checked_timestamp: float,
+                            subject_prefix: str | None,
+                            submission_label: str | None) -> list[str]:
         after_ts = int(last_checked_timestamp)
         parts = [f"after:{after_ts}"]
 
@@ -94,81 +246,91 @@ class GmailClient:
         query = " ".join(parts)
         logger.info("Gmail query: %s", query)
 
-        try:
-            result = (
-                self.service.users()
-                .messages()
-                .list(userId="me", q=query, maxResults=50)
-                .execute()
-            )
-        except HttpError as e:
-            logger.error("Gmail API error listing messages: %s", e)
-            return []
-
-        messages = result.get("messages", [])
-        logger.info("Gmail query returned %d message(s).", len(messages))
-        submissions = []
-
-        for msg_ref in messages:
-            try:
-                parsed = self._fetch_and_parse(msg_ref["id"])
-                if parsed:
-                    submissions.append(parsed)
-            except Exception as e:
-                logger.error("Error processing message %s: %s", msg_ref["id"], e)
-
-        return submissions
-
-    def _fetch_and_parse(self, message_id: str) -> dict | None:
-        msg = (
+        result = (
             self.service.users()
             .messages()
-            .get(userId="me", id=message_id, format="full")
+            .list(userId="me", q=query, maxResults=50, fields=_LIST_FIELDS)
             .execute()
         )
+        messages = result.get("messages", [])
+        logger.info("Gmail query returned %d message(s).", len(messages))
+        return [m["id"] for m in messages]
 
-        headers = {h["name"].lower(): h["value"] for h in msg["payload"].get("headers", [])}
-        subject = headers.get("subject", "")
-        logger.info("Checking message %s: subject=%r", message_id, subject)
-
-        # Skip replies — if In-Reply-To header is present it's part of a thread
-        if "in-reply-to" in headers:
-            logger.info("  → skipped (is a reply)")
-            return None
+    def _list_history_message_ids(self, start_history_id: str,
+                                  submission_label: str | None
+                                  ) -> tuple[list[str] | None, str]:
+        """
+        Message IDs added to (or labelled into) the submission label/inbox
+        since start_history_id, oldest first, plus the mailbox's current
+        history ID. Returns (None, start_history_id) if the label can't be
+        resolved, so the caller falls back to searching.
+        """
+        label_id = self._label_id(submission_label) if submission_label else "INBOX"
+        if label_id is None:
+            logger.error("Gmail label %r not found; falling back to search.",
+                         submission_label)
+            return None, start_history_id
+
+        ids: dict[str, None] = {}  # ordered set
+        history_id = start_history_id
+        page_token = None
+        while True:
+            resp = (
+                self.service.users()
+                .history()
+                .list(userId="me", startHistoryId=start_history_id,
+                      historyTypes=["messageAdded", "labelAdded"],
+                      labelId=label_id, pageToken=page_token,
+                      fields=_HISTORY_FIELDS)
+                .execute()
+            )
+            for record in resp.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    ids[added["message"]["id"]] = None
+                for added in record.get("labelsAdded", []):
+                    if label_id in added.get("labelIds", []):
+                        ids[added["message"]["id"]] = None
+            history_id = resp.get("historyId", history_id)
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+
+        logger.info("Gmail history since %s returned %d message(s).",
+                    start_history_id, len(ids))
+        return list(ids), history_id
+
+    def _label_id(self, name: str) -> str | None:
+        if name not in _label_id_cache:
+            labels = (
+                self.service.users()
+                .labels()
+                .list(userId="me", fields="labels(id,name)")
+                .execute()
+                .get("labels", [])
+            )
+            _label_id_cache.update({label["name"]: label["id"] for label in labels})
+        return _label_id_cache.get(name)
 
-        # Skip if thread has more than 1 message (i.e. we've already replied)
-        thread_id = msg.get("threadId", message_id)
-        thread = (
-            self.service.users()
-            .threads()
-            .get(userId="me", id=thread_id, format="minimal")
-            .execute()
-        )
-        thread_len = len(thread.get("messages", []))
-        if thread_len > 1:
-            logger.info("  → skipped (thread has %d messages, already processed)", thread_len)
-            return None
-
-        subject_raw = headers.get("subject", "")
-        subject_clean = _REPLY_SUBJECT_RE.sub("", subject_raw).strip()
-
-        from_raw = headers.get("from", "")
-        author_name, author_email = _parse_from_header(from_raw)
-
-        body = _extract_body(msg["payload"])
-        medium_url = _find_medium_url(body) or _find_medium_url(subject_raw)
-
-        return {
-            "gmail_message_id": message_id,
-            "gmail_thread_id": thread_id,
-            "title": subject_clean or subject_raw,
-            "author_name": author_name,
-            "author_email": author_email,
-            "medium_url": medium_url,
-            "email_subject": subject_raw,
-            "email_body": body,
-            "message_id_header": headers.get("message-id", ""),
-        }
+    def _batch_execute(self, requests: dict) -> dict:
+        """
+        Execute {key: HttpRequest} as Gmail batch calls of up to _BATCH_LIMIT.
+        Returns {key: response}; individual failures are logged and omitted.
+        """
+        results: dict = {}
+
+        def _on_response(request_id, response, exception):
+            if exception is not None:
+                logger.error("Gmail batch request %s failed: %s", request_id, exception)
+                return
+            results[request_id] = response
+
+        items = list(requests.items())
+        for start in range(0, len(items), _BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=_on_response)
+            for key, request in items[start:start + _BATCH_LIMIT]:
+                batch.add(request, request_id=key)
+            batch.execute()
+        return results
 
     # ── Sending ───────────────────────────────────────────────────────────────
 
@@ -191,6 +353,7 @@ class GmailClient:
         )
         self._send_reply(sub, body)
 
+    @_serialized
     def _send_reply(self, sub, body_text: str) -> None:
         subject = f"Re: {sub['email_subject']}"
 
@@ -199,16 +362,19 @@ class GmailClient:
         mime_msg["Subject"] = subject
         mime_msg.attach(MIMEText(body_text, "plain", "utf-8"))
 
-        # Thread headers so it appears as a reply in the submitter's inbox
-        if sub["gmail_message_id"]:
+        # Thread headers so it appears as a reply in the submitter's inbox.
+        # The Message-ID is captured at ingest; only rows stored before that
+        # column existed need the extra metadata fetch.
+        original_msg_id = sub.get("message_id_header")
+        if not original_msg_id and sub["gmail_message_id"]:
             original_msg_id = _get_original_message_id_header(
                 self.service, sub["gmail_message_id"]
             )
-            if original_msg_id:
-                mime_msg["In-Reply-To"] = original_msg_id
-                mime_msg["References"] = original_msg_id
+        if original_msg_id:
+            mime_msg["In-Reply-To"] = original_msg_id
+            mime_msg["References"] = original_msg_id
 
-        raw = base64.urlsafe_b64encode(mime_msg.as_bytes()).decode()
+        raw = _encode_b64url(mime_msg.as_bytes())
         body_payload = {"raw": raw}
 
         if sub["gmail_thread_id"]:
@@ -227,7 +393,14 @@ class GmailClient:
 
 # ── Auth helper ───────────────────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=None)
 def _build_service(credentials_path: str, token_path: str):
+    """
+    Build the Gmail API service once per (credentials, token) pair and reuse
+    it, so repeated GmailClient() construction keeps the same authorized HTTP
+    connection instead of redoing OAuth loading and the TLS handshake. The
+    credentials object refreshes its access token in place when it expires.
+    """
     creds = None
     if os.path.exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
@@ -258,35 +431,93 @@ def _build_service(credentials_path: str, token_path: str):
 
 # ── Parsing helpers ───────────────────────────────────────────────────────────
 
+# Gmail uses the URL-safe base64 alphabet. Translating to/from the standard
+# alphabet lets us call binascii directly instead of going through the
+# base64 module's wrappers.
+_B64URL_TO_STD = str.maketrans("-_", "+/")
+_B64STD_TO_URL = bytes.maketrans(b"+/", b"-_")
+
+
+def _decode_b64url(data: str) -> str:
+    padded = data.translate(_B64URL_TO_STD) + "=" * (-len(data) % 4)
+    return binascii.a2b_base64(padded).decode("utf-8", errors="replace")
+
+
+def _encode_b64url(raw: bytes) -> str:
+    return binascii.b2a_base64(raw, newline=False).translate(_B64STD_TO_URL).decode()
+
+
+def _headers_of(msg: dict) -> dict:
+    return {h["name"].lower(): h["value"] for h in msg["payload"].get("headers", [])}
+
+
+def _parse_message(message_id: str, msg: dict, headers: dict) -> dict:
+    """Turn an already-fetched format=full message into a submission dict."""
+    subject_raw = headers.get("subject", "")
+    subject_clean = _REPLY_SUBJECT_RE.sub("", subject_raw).strip()
+
+    from_raw = headers.get("from", "")
+    author_name, author_email = _parse_from_header(from_raw)
+
+    body = _extract_body(msg["payload"])
+    medium_url = _find_medium_url(body) or _find_medium_url(subject_raw)
+
+    return {
+        "gmail_message_id": message_id,
+        "gmail_thread_id": msg.get("threadId", message_id),
+        "title": subject_clean or subject_raw,
+        "author_name": author_name,
+        "author_email": author_email,
+        "medium_url": medium_url,
+        "email_subject": subject_raw,
+        "email_body": body,
+        "message_id_header": headers.get("message-id", ""),
+    }
+
+
 def _parse_from_header(from_raw: str) -> tuple[str, str]:
     """Parse 'Display Name <email@example.com>' into (name, email)."""
-    match = re.match(r'"?([^"<]+)"?\s*<([^>]+)>', from_raw.strip())
+    match = _FROM_HEADER_RE.match(from_raw.strip())
     if match:
         return match.group(1).strip(), match.group(2).strip()
     # Plain email with no display name
-    email_match = re.match(r"[\w.+-]+@[\w.-]+", from_raw)
+    email_match = _FROM_BARE_RE.match(from_raw)
     if email_match:
         return "", email_match.group(0)
     return "", from_raw.strip()
 
 
 def _extract_body(payload: dict) -> str:
-    """Recursively extract plain-text body from a Gmail message payload."""
-    mime_type = payload.get("mimeType", "")
-
-    if mime_type == "text/plain":
-        data = payload.get("body", {}).get("data", "")
-        if data:
-            return base64.urlsafe_b64decode(data).decode("utf-8", errors="replace")
-        return ""
-
-    if mime_type.startswith("multipart/"):
-        for part in payload.get("parts", []):
-            text = _extract_body(part)
-            if text:
-                return text
-
-    return ""
+    """
+    Extract the plain-text body from a Gmail message payload.
+
+    Walks the MIME tree breadth-first and returns the first non-empty
+    text/plain part. If the message has no plain-text part at all, falls
+    back to the first text/html part with its markup stripped.
+    """
+    queue = deque([payload])
+    html_data = None
+    while queue:
+        part = queue.popleft()
+        mime_type = part.get("mimeType", "")
+        data = part.get("body", {}).get("data", "")
+
+        if mime_type == "text/plain" and data:
+            return _decode_b64url(data)
+        if mime_type == "text/html" and data and html_data is None:
+            html_data = data
+        elif mime_type.startswith("multipart/"):
+            queue.extend(part.get("parts", []))
+
+    return _strip_html(_decode_b64url(html_data)) if html_data else ""
+
+
+def _strip_html(text: str) -> str:
+    """Crude HTML → text: drop scripts/styles and tags, keep line breaks."""
+    text = _HTML_DROP_RE.sub("", text)
+    text = _HTML_BREAK_RE.sub("\n", text)
+    text = html.unescape(_HTML_TAG_RE.sub("", text))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
 
 
 def _find_medium_url(text: str) -> str | None:
@@ -301,7 +532,7 @@ def _get_original_message_id_header(service, gmail_message_id: str) -> str | Non
             service.users()
             .messages()
             .get(userId="me", id=gmail_message_id, format="metadata",
-                 metadataHeaders=["Message-ID"])
+                 metadataHeaders=["Message-ID"], fields="payload/headers")
             .execute()
         )
         headers = {h["name"].lower(): h["value"] for h in msg["payload"].get("headers", [])}
@@ -2,10 +2,16 @@
 llm.py — OpenAI-based reviewer assignment for the TEM review bot.
 """
 import asyncio
+import copy
+import functools
 import json
 import logging
 import os
+import re
+import time
+from collections import OrderedDict
 
+import httpx
 from openai import AsyncOpenAI
 
 import db
@@ -15,56 +21,195 @@ logger = logging.getLogger(__name__)
 
 _client = None
 _MAX_LLM_ATTEMPTS = 3
+_MAX_FALLBACKS = 3
+# Picking 1–2 usernames from a short list is well within the small model;
+# override with llm.model in config.yaml.
+_DEFAULT_MODEL = "gpt-4o-mini"
 
 
 def _get_client() -> AsyncOpenAI:
     global _client
     if _client is None:
-        _client = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        # HTTP/2 multiplexes concurrent picks over one kept-alive TLS
+        # connection instead of opening a socket per in-flight request.
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        _client = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"],
+                              http_client=http_client)
     return _client
 
 
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+
+class _RateLimiter:
+    """
+    Client-side token buckets for requests/minute and tokens/minute.
+
+    acquire() waits until both buckets have room, so bursts are spread out
+    locally instead of bouncing off 429s and retry backoff. After each
+    response the buckets are clamped to OpenAI's x-ratelimit-remaining-*
+    headers, so usage from other clients on the same key is accounted for.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm,
+                    0.05,
+                )
+                await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers) -> None:
+        for header, attr in (("x-ratelimit-remaining-requests", "_requests"),
+                             ("x-ratelimit-remaining-tokens", "_tokens")):
+            raw = headers.get(header)
+            if raw is None:
+                continue
+            try:
+                remaining = float(raw)
+            except ValueError:
+                continue
+            setattr(self, attr, min(getattr(self, attr), remaining))
+
+
+_limiter: _RateLimiter | None = None
+# Rough prompt size estimate; CJK text runs close to one token per character.
+_CHARS_PER_TOKEN = 2
+# The reply is a single small JSON object (two usernames, a category and a
+# 2–3 sentence reason), so cap decoding well above that but far below the
+# model default.
+_MAX_OUTPUT_TOKENS = 256
+
+
+def _get_limiter(config: dict) -> _RateLimiter:
+    global _limiter
+    if _limiter is None:
+        llm_cfg = config.get("llm") or {}
+        _limiter = _RateLimiter(rpm=llm_cfg.get("rpm", 500),
+                                tpm=llm_cfg.get("tpm", 30000))
+    return _limiter
+
+
+# ── Pick cache ────────────────────────────────────────────────────────────────
+
+# (kind, gmail_message_id, ...) → future of a successful pick. A replayed
+# event (content provided twice, a repeated decline) reuses the answer, and a
+# duplicate arriving while the first call is still in flight awaits it
+# instead of starting another. Failed picks are evicted so they're retried.
+_PICK_CACHE_SIZE = 128
+_pick_cache: "OrderedDict[tuple, asyncio.Future]" = OrderedDict()
+
+
+async def _cached_pick(key: tuple | None, make) -> dict:
+    """Return the cached result for `key`, or await make() and cache it."""
+    if key is None:
+        return await make()
+    fut = _pick_cache.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(make())
+        _pick_cache[key] = fut
+        while len(_pick_cache) > _PICK_CACHE_SIZE:
+            _pick_cache.popitem(last=False)
+    else:
+        _pick_cache.move_to_end(key)
+        logger.info("Reusing cached LLM pick for %s", key[:2])
+    try:
+        # shield: one caller being cancelled mustn't cancel the shared call.
+        result = await asyncio.shield(fut)
+    except Exception:
+        if _pick_cache.get(key) is fut:
+            del _pick_cache[key]
+        raise
+    return copy.deepcopy(result)
+
+
 # ── Reviewer file ─────────────────────────────────────────────────────────────
 
+# path → (st_mtime_ns, st_size, content)
+_reviewers_cache: dict[str, tuple[int, int, str]] = {}
+
+
 def _load_reviewers_markdown(config: dict) -> str:
-    """Load the reviewers.md file. Reloaded on every call (file is small)."""
+    """Load the reviewers.md file, re-reading only when its mtime/size change."""
     path = config.get("reviewers_file", "./reviewers.md")
     try:
+        st = os.stat(path)
+        cached = _reviewers_cache.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
         with open(path, "r", encoding="utf-8") as f:
-            return f.read()
+            content = f.read()
     except FileNotFoundError:
         logger.warning("Reviewers file not found at %s", path)
         return "(No reviewer list found)"
+    _reviewers_cache[path] = (st.st_mtime_ns, st.st_size, content)
+    return content
 
 
 # ── Workload helpers ──────────────────────────────────────────────────────────
 
-def _build_history_text() -> str:
-    rows = db.get_recent_assignment_history(days=90)
+def _build_history_and_workload() -> tuple[str, str]:
+    """
+    Build the recent-history text (last 10 assignments) and the per-reviewer
+    workload summary (last 90 days). Both are aggregated in SQL so only the
+    rows actually shown are loaded.
+    """
+    rows = db.get_recent_assignment_history(days=90, limit=10)
     if not rows:
-        return "(No recent assignment history)"
+        return "(No recent assignment history)", "(No workload data)"
+
+    # Rows are newest-first; keep the first row per (submission, reviewer)
+    recent = {}
+    for row in rows:
+        recent.setdefault((row["submission_id"], row["reviewer_tg_username"]), row)
     lines = []
-    seen = set()
-    for row in rows[:10]:
-        key = (row["submission_id"], row["reviewer_tg_username"])
-        if key in seen:
-            continue
-        seen.add(key)
+    for row in recent.values():
         date_str = row["assigned_at"][:10] if row["assigned_at"] else "?"
         title = row["title"] or f"Submission #{row['submission_id']}"
         lines.append(f"- {date_str}: 《{title}》 → @{row['reviewer_tg_username']}")
-    return "\n".join(lines) or "(No recent assignment history)"
 
+    history_text = "\n".join(lines)
+    workload_summary = "\n".join(
+        f"- @{u}: {n} 篇" for u, n in db.get_workload_counts(days=90)
+    ) or "(No workload data)"
+    return history_text, workload_summary
 
-def _build_workload_summary() -> str:
-    rows = db.get_recent_assignment_history(days=90)
-    counts: dict[str, int] = {}
-    for row in rows:
-        u = row["reviewer_tg_username"]
-        counts[u] = counts.get(u, 0) + 1
-    if not counts:
-        return "(No workload data)"
-    return "\n".join(f"- @{u}: {n} 篇" for u, n in sorted(counts.items()))
+
+async def _load_prompt_inputs(config: dict) -> tuple[str, tuple[str, str]]:
+    """
+    Read reviewers.md and the assignment history off the event loop, so
+    concurrent picks keep making progress while one waits on disk/SQLite.
+    """
+    return await asyncio.gather(
+        asyncio.to_thread(_load_reviewers_markdown, config),
+        db.run(_build_history_and_workload),
+    )
 
 
 # ── Core assignment ───────────────────────────────────────────────────────────
@@ -83,6 +228,8 @@ _SYSTEM_PROMPT = """\
    - 但不能因為某人最近分配過，就減少回傳的 Reviewer 人數。最近分配過仍然要選。
 5. reviewer1 與 reviewer2 必須是兩位不同的人，不能重複。
 6. 簡要說明為什麼選擇這些人（含工作量考量）
+7. 另外依適合程度排序，列出最多 3 位備選 Reviewer（fallbacks），作為有人無法審稿時的替補；
+   不可與 reviewer1、reviewer2 重複，沒有其他合適人選時回傳空陣列 []。
 
 ## Reviewer 列表
 {reviewer_list_markdown}
@@ -90,59 +237,234 @@ _SYSTEM_PROMPT = """\
 ## 回覆格式 (務必遵守)
 
 請用以下 JSON 格式回覆，不要加任何其他文字或 markdown：
-{{"reviewer1": "tg_username", "reviewer2": "tg_username_or_empty", "category": "主要類別", "reason_zh": "用中文簡要說明為什麼選擇，包含工作量平衡說明 (2-3句話)"}}\
+{{"reviewer1": "tg_username", "reviewer2": "tg_username_or_empty", "fallbacks": ["tg_username", ...], "category": "主要類別", "reason_zh": "用中文簡要說明為什麼選擇，包含工作量平衡說明 (2-3句話)"}}\
 """
 
-_USER_PROMPT = """\
-投稿主題：{email_subject}
+# The per-submission prompts are built with f-strings rather than
+# str.format templates: the literal parts are compiled once at import and
+# nothing is re-parsed per call.
+_USER_PROMPT_INSTRUCTIONS = (
+    "請根據以上資訊，選出最適合且近期工作量較低的 2 位 Reviewer。\n"
+    "注意：只要該類別有 ≥ 2 位候選人，就必須回傳 2 位不同的 Reviewer，"
+    "不能因為他們最近分配過就只回傳 1 位。"
+)
+_BATCH_PROMPT_INSTRUCTIONS = (
+    "請根據以上資訊，為每篇投稿選出最適合且近期工作量較低的 2 位 Reviewer，"
+    "同一批投稿之間也請平衡工作量。\n"
+    "注意：只要該類別有 ≥ 2 位候選人，就必須回傳 2 位不同的 Reviewer，"
+    "不能因為他們最近分配過就只回傳 1 位。\n"
+    "請在 results 陣列中為每篇投稿各回傳一筆，id 填投稿編號（# 後的數字），"
+    "其餘欄位與單篇格式相同。"
+)
+
+
+def _submission_prompt(email_data: dict) -> str:
+    return (
+        f"投稿主題：{email_data.get('email_subject', '')}\n\n"
+        f"寄件人：{email_data.get('author_name', '')} "
+        f"({email_data.get('author_email', '')})\n\n"
+        f"信件內容：{_clean_body(email_data.get('email_body', ''))}\n"
+    )
 
-寄件人：{author_name} ({author_email})
 
-信件內容：{email_body}
+def _workload_prompt(history_text: str, workload_summary: str) -> str:
+    return (
+        f"## 近期分配紀錄（最近90天）\n{history_text}\n\n"
+        f"## 近期 Reviewer 工作量統計\n{workload_summary}\n\n"
+    )
 
-文章內容（如有）：{article_content}
 
-## 近期分配紀錄（最近90天）
-{history_text}
+def _user_prompt(email_data: dict, article_content: str,
+                 history_text: str, workload_summary: str) -> str:
+    return (
+        f"{_submission_prompt(email_data)}\n"
+        f"文章內容（如有）：{(article_content or '')[:8000]}\n\n"
+        f"{_workload_prompt(history_text, workload_summary)}"
+        f"{_USER_PROMPT_INSTRUCTIONS}"
+    )
 
-## 近期 Reviewer 工作量統計
-{workload_summary}
 
-請根據以上資訊，選出最適合且近期工作量較低的 2 位 Reviewer。
-注意：只要該類別有 ≥ 2 位候選人，就必須回傳 2 位不同的 Reviewer，不能因為他們最近分配過就只回傳 1 位。\
-"""
+def _batch_user_prompt(chunk: list[tuple[int, dict]],
+                       history_text: str, workload_summary: str) -> str:
+    items = "\n".join(
+        f"### 投稿 #{key}\n{_submission_prompt(email_data)}"
+        for key, email_data in chunk
+    )
+    return (
+        f"以下共有 {len(chunk)} 篇新投稿，請分別為每一篇選出 Reviewer。\n\n"
+        f"{items}\n"
+        f"{_workload_prompt(history_text, workload_summary)}"
+        f"{_BATCH_PROMPT_INSTRUCTIONS}"
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _system_prompt(reviewer_md: str) -> str:
+    """
+    Format the system prompt once per reviewers.md version. Keeping it
+    byte-identical across calls (all per-submission data goes in the user
+    message) also lets OpenAI's automatic prompt caching reuse the prefix.
+    """
+    return _SYSTEM_PROMPT.format(reviewer_list_markdown=reviewer_md)
+
+
+# Structured Outputs: the API guarantees the reply is JSON matching this
+# schema, so no fence-stripping or lenient parsing is needed. Strict mode
+# requires every property to be listed in "required"; reviewer2 is "" when
+# there's no second reviewer. fallbacks is a ranked list of substitutes that
+# handle_reviewer_decline consumes before asking the model again.
+_REVIEWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reviewer1": {"type": "string"},
+        "reviewer2": {"type": "string"},
+        "fallbacks": {"type": "array", "items": {"type": "string"}},
+        "category": {"type": "string"},
+        "reason_zh": {"type": "string"},
+    },
+    "required": ["reviewer1", "reviewer2", "fallbacks", "category", "reason_zh"],
+    "additionalProperties": False,
+}
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "reviewer_pick",
+        "schema": _REVIEWER_SCHEMA,
+        "strict": True,
+    },
+}
+
+
+# Several submissions in one request: the system prompt and reviewer list
+# are paid for once, and the batch counts as a single request against RPM.
+_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "reviewer_picks",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            **_REVIEWER_SCHEMA["properties"],
+                        },
+                        "required": ["id", *_REVIEWER_SCHEMA["required"]],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+        "strict": True,
+    },
+}
+_MAX_BATCH_SIZE = 5
+
+_MAX_BODY_CHARS = 2000
+_HTML_HINT_RE = re.compile(r"<(?:html|body|div|p|br|table|span)\b", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_QUOTED_LINE_RE = re.compile(r"^[ \t]*>.*$", re.MULTILINE)
+# Inline base64 (images, attachments) — long unbroken runs with no spaces.
+_BASE64_RUN_RE = re.compile(r"[A-Za-z0-9+/=]{80,}")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _clean_body(body: str) -> str:
+    """
+    Reduce an email body to the text worth sending to the model: strip HTML
+    tags and base64 blobs, drop quoted reply lines, collapse whitespace and
+    truncate. Tokens spent on boilerplate only slow the call down.
+    """
+    if not body:
+        return ""
+    if _HTML_HINT_RE.search(body):
+        body = _HTML_TAG_RE.sub(" ", body)
+    body = _QUOTED_LINE_RE.sub("", body)
+    body = _BASE64_RUN_RE.sub(" ", body)
+    return _WHITESPACE_RE.sub(" ", body).strip()[:_MAX_BODY_CHARS]
 
 
 async def pick_reviewers(email_data: dict, config: dict = None,
                          article_content: str = "") -> dict:
     """
     Call OpenAI to pick 2 reviewers for a new submission.
-    Returns dict with keys: reviewer1, reviewer2, category, reason_zh
+    Returns dict with keys: reviewer1, reviewer2, fallbacks, category, reason_zh
+    (fallbacks is a ranked list of substitute usernames, possibly empty)
     """
     if config is None:
         import config as cfg
         config = cfg.load()
 
-    reviewer_md = _load_reviewers_markdown(config)
-    history_text = _build_history_text()
-    workload_summary = _build_workload_summary()
-
-    system_prompt = _SYSTEM_PROMPT.format(reviewer_list_markdown=reviewer_md)
-    user_prompt = _USER_PROMPT.format(
-        email_subject=email_data.get("email_subject", ""),
-        author_name=email_data.get("author_name", ""),
-        author_email=email_data.get("author_email", ""),
-        email_body=(email_data.get("email_body", "") or "")[:3000],
-        article_content=(article_content or "")[:8000],
-        history_text=history_text,
-        workload_summary=workload_summary,
-    )
+    async def _pick() -> dict:
+        reviewer_md, (history_text, workload_summary) = await _load_prompt_inputs(config)
+
+        system_prompt = _system_prompt(reviewer_md)
+        user_prompt = _user_prompt(email_data, article_content,
+                                   history_text, workload_summary)
+
+        result = await _call_llm_with_retry(system_prompt, user_prompt, reviewer_md,
+                                             config, required_keys=("reviewer1",))
+        logger.info("LLM picked reviewers: %s, %s (category: %s)",
+                    result.get("reviewer1"), result.get("reviewer2"), result.get("category"))
+        return result
+
+    message_id = email_data.get("gmail_message_id")
+    key = ("pick", message_id, hash(article_content)) if message_id else None
+    return await _cached_pick(key, _pick)
 
-    result = await _call_llm_with_retry(system_prompt, user_prompt, reviewer_md,
-                                         required_keys=("reviewer1",))
-    logger.info("LLM picked reviewers: %s, %s (category: %s)",
-                result.get("reviewer1"), result.get("reviewer2"), result.get("category"))
-    return result
+
+async def pick_reviewers_batch(submissions: list[tuple[int, dict]],
+                               config: dict) -> dict[int, dict]:
+    """
+    Pick reviewers for several new submissions with one request per chunk of
+    up to _MAX_BATCH_SIZE. `submissions` is [(key, email_data)] where key is
+    any int unique within the call (it's only used to match results back).
+    Returns {key: result} (same keys as pick_reviewers) for the chunks that
+    succeeded; submissions in a failed chunk are left out so the caller can
+    fall back to pick_reviewers.
+    """
+    reviewer_md, (history_text, workload_summary) = await _load_prompt_inputs(config)
+    system_prompt = _system_prompt(reviewer_md)
+
+    async def _pick_chunk(chunk: list[tuple[int, dict]]) -> dict[int, dict]:
+        user_prompt = _batch_user_prompt(chunk, history_text, workload_summary)
+        expected = {key for key, _ in chunk}
+
+        def _validate(result: dict) -> None:
+            ids = [r.get("id") for r in result.get("results", [])]
+            if sorted(ids) != sorted(expected):
+                raise ValueError(f"LLM batch returned ids {ids}, expected {sorted(expected)}")
+            for r in result["results"]:
+                _validate_reviewers_exist(r, reviewer_md)
+
+        result = await _call_llm_with_retry(
+            system_prompt, user_prompt, reviewer_md, config,
+            response_format=_BATCH_RESPONSE_FORMAT,
+            max_tokens=_MAX_OUTPUT_TOKENS * len(chunk),
+            validate=_validate,
+        )
+        return {r.pop("id"): r for r in result["results"]}
+
+    chunks = [submissions[i:i + _MAX_BATCH_SIZE]
+              for i in range(0, len(submissions), _MAX_BATCH_SIZE)]
+    picks: dict[int, dict] = {}
+    for chunk, outcome in zip(chunks, await asyncio.gather(
+            *(_pick_chunk(chunk) for chunk in chunks), return_exceptions=True)):
+        if isinstance(outcome, Exception):
+            logger.warning("Batched reviewer pick failed for %s: %s",
+                           [email_data.get("title") for _, email_data in chunk], outcome)
+            continue
+        picks.update(outcome)
+    titles = {key: email_data.get("title") for key, email_data in submissions}
+    for key, result in picks.items():
+        logger.info("LLM picked reviewers for 《%s》: %s, %s (category: %s)", titles[key],
+                    result.get("reviewer1"), result.get("reviewer2"), result.get("category"))
+    return picks
 
 
 async def pick_replacement_reviewer(email_data: dict, declined_username: str,
@@ -156,9 +478,18 @@ async def pick_replacement_reviewer(email_data: dict, declined_username: str,
         import config as cfg
         config = cfg.load()
 
-    reviewer_md = _load_reviewers_markdown(config)
-    history_text = _build_history_text()
-    workload_summary = _build_workload_summary()
+    message_id = email_data.get("gmail_message_id")
+    excluded = frozenset(u.lower() for u in excluded_usernames)
+    key = ("replacement", message_id, excluded) if message_id else None
+    return await _cached_pick(key, functools.partial(
+        _pick_replacement, email_data, declined_username, excluded_usernames,
+        excluded, config))
+
+
+async def _pick_replacement(email_data: dict, declined_username: str,
+                            excluded_usernames: list[str], excluded: frozenset,
+                            config: dict) -> dict:
+    reviewer_md, (history_text, workload_summary) = await _load_prompt_inputs(config)
 
     excluded_str = ", ".join(f"@{u}" for u in excluded_usernames) if excluded_usernames else "none"
     extra_constraint = (
@@ -168,26 +499,42 @@ async def pick_replacement_reviewer(email_data: dict, declined_username: str,
         f"只需回覆 1 位 Reviewer (放在 reviewer1 欄位，reviewer2 留空字串)。"
     )
 
-    system_prompt = _SYSTEM_PROMPT.format(reviewer_list_markdown=reviewer_md)
+    system_prompt = _system_prompt(reviewer_md)
     user_prompt = (
-        _USER_PROMPT.format(
-            email_subject=email_data.get("email_subject", ""),
-            author_name=email_data.get("author_name", ""),
-            author_email=email_data.get("author_email", ""),
-            email_body=(email_data.get("email_body", "") or "")[:3000],
-            article_content="",
-            history_text=history_text,
-            workload_summary=workload_summary,
-        )
+        _user_prompt(email_data, "", history_text, workload_summary)
         + extra_constraint
     )
 
+    def _validate(result: dict) -> None:
+        _validate_reviewers_exist(result, reviewer_md, required_keys=("reviewer1",))
+        # Checked here rather than by the caller so an excluded pick is
+        # retried, and never cached.
+        if result["reviewer1"].strip().lower() in excluded:
+            raise ValueError(f"LLM returned excluded reviewer: '{result['reviewer1']}'")
+
     result = await _call_llm_with_retry(system_prompt, user_prompt, reviewer_md,
-                                         required_keys=("reviewer1",))
+                                         config, validate=_validate)
     logger.info("LLM picked replacement reviewer: %s", result.get("reviewer1"))
     return result
 
 
+def next_fallback_reviewer(fallbacks: list[str], excluded_usernames: list[str],
+                           config: dict) -> str | None:
+    """
+    First stored fallback that isn't excluded and is still listed in
+    reviewers.md, or None if the list is exhausted.
+    """
+    if not fallbacks:
+        return None
+    known = {u.lower() for u in reviewers_mod.get_all_reviewer_usernames(
+        _load_reviewers_markdown(config))}
+    excluded = {u.lower() for u in excluded_usernames}
+    for name in fallbacks:
+        if name.lower() in known and name.lower() not in excluded:
+            return name
+    return None
+
+
 def _validate_reviewers_exist(result: dict, reviewer_md: str,
                               required_keys=("reviewer1",)) -> None:
     """
@@ -223,39 +570,104 @@ def _validate_reviewers_exist(result: dict, reviewer_md: str,
             f"LLM returned duplicate reviewers (both '{result['reviewer1']}')."
         )
 
+    # Fallbacks are only hints: drop unknown or duplicate names instead of
+    # failing the whole pick.
+    picked = {result["reviewer1"].lower(), result["reviewer2"].lower()}
+    fallbacks = []
+    for name in result.get("fallbacks") or []:
+        canonical = known_lower.get(str(name).strip().lstrip("@").lower())
+        if canonical and canonical.lower() not in picked:
+            picked.add(canonical.lower())
+            fallbacks.append(canonical)
+    result["fallbacks"] = fallbacks[:_MAX_FALLBACKS]
+
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+async def _read_stream(stream) -> tuple[str, str, str | None]:
+    """
+    Collect a streamed completion into (content, refusal, finish_reason).
+    Stops reading as soon as the content parses as a complete JSON object,
+    rather than waiting for the trailing finish/usage events.
+    """
+    content: list[str] = []
+    refusal: list[str] = []
+    finish_reason = None
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            delta = choice.delta
+            if getattr(delta, "refusal", None):
+                refusal.append(delta.refusal)
+            if delta.content:
+                content.append(delta.content)
+                if delta.content.rstrip().endswith("}"):
+                    try:
+                        json.loads("".join(content))
+                        break
+                    except ValueError:
+                        pass
+    finally:
+        await stream.close()
+    return "".join(content).strip(), "".join(refusal), finish_reason
+
+
 async def _call_llm_with_retry(system_prompt: str, user_prompt: str,
-                                reviewer_md: str,
-                                required_keys=("reviewer1",)) -> dict:
+                                reviewer_md: str, config: dict,
+                                required_keys=("reviewer1",),
+                                response_format: dict = _RESPONSE_FORMAT,
+                                max_tokens: int = _MAX_OUTPUT_TOKENS,
+                                validate=None) -> dict:
     """
-    Call gpt-4o in JSON mode, parse + validate, retry on empty/bad responses.
+    Call the configured model (llm.model) with a strict JSON schema, validate,
+    retry on empty/bad responses.
+    `validate(result)` replaces the single-pick reviewer check when given.
+    Each attempt first reserves capacity from the shared rate limiter.
     Raises the last exception if all attempts fail.
     """
     client = _get_client()
+    model = (config.get("llm") or {}).get("model", _DEFAULT_MODEL)
+    limiter = _get_limiter(config)
+    est_tokens = (len(system_prompt) + len(user_prompt)) // _CHARS_PER_TOKEN \
+        + max_tokens
     last_err: Exception | None = None
     for attempt in range(1, _MAX_LLM_ATTEMPTS + 1):
         try:
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                temperature=0.3,
-                response_format={"type": "json_object"},
+            await limiter.acquire(est_tokens)
+            raw_response = await client.chat.completions.with_raw_response.create(
+                model=model,
+                temperature=0,
+                max_tokens=max_tokens,
+                response_format=response_format,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
+                stream=True,
             )
-            choice = response.choices[0]
-            raw = (choice.message.content or "").strip()
-            finish_reason = getattr(choice, "finish_reason", None)
+            limiter.update_from_headers(raw_response.headers)
+            raw, refusal, finish_reason = await _read_stream(raw_response.parse())
+            if refusal:
+                raise ValueError(f"LLM refused: {refusal}")
             if not raw:
                 raise ValueError(
                     f"LLM returned empty content (finish_reason={finish_reason})"
                 )
-            result = _parse_json_response(raw)
-            _validate_reviewers_exist(result, reviewer_md,
-                                      required_keys=required_keys)
+            try:
+                result = json.loads(raw)
+            except json.JSONDecodeError as e:
+                # Only reachable on a truncated response (finish_reason=length).
+                raise ValueError(
+                    f"LLM returned invalid JSON (finish_reason={finish_reason}): {e}"
+                ) from e
+            if validate is not None:
+                validate(result)
+            else:
+                _validate_reviewers_exist(result, reviewer_md,
+                                          required_keys=required_keys)
             return result
         except Exception as e:
             last_err = e
@@ -266,19 +678,3 @@ async def _call_llm_with_retry(system_prompt: str, user_prompt: str,
                 await asyncio.sleep(1.5 * attempt)
     assert last_err is not None
     raise last_err
-
-
-def _parse_json_response(raw: str) -> dict:
-    """Strip markdown fences and parse JSON."""
-    raw = raw.strip()
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    raw = raw.strip().rstrip("`").strip()
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError as e:
-        logger.error("Failed to parse LLM JSON response: %s\nRaw (len=%d): %r",
-                     e, len(raw), raw)
-        raise ValueError(f"LLM returned invalid JSON: {e}") from e
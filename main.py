@@ -4,9 +4,11 @@ main.py — Entry point: initialises DB, registers Telegram handlers, starts sch
 PTB v21 manages its own event loop via app.run_polling() — do NOT wrap in asyncio.run().
 Use post_init to run setup code inside PTB's event loop.
 """
+import asyncio
 import base64
 import logging
 import os
+import signal
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -34,9 +36,7 @@ from telegram_handlers import (
     cmd_add_reviewer,
     cmd_remove_reviewer,
     cmd_list_categories,
-    cb_accept,
-    cb_decline,
-    cb_done,
+    cb_reviewer_button,
     cb_confirm_rejection,
     cb_confirm_delete,
 )
@@ -107,17 +107,31 @@ OPERATOR_COMMANDS = PUBLIC_COMMANDS + [
 ]
 
 
+def _reload_config() -> None:
+    """SIGHUP: pick up config.yaml edits now rather than at the next recheck."""
+    try:
+        cfg.reload()
+    except Exception:
+        logger.exception("Config reload on SIGHUP failed; keeping the previous config.")
+    else:
+        logger.info("Config reloaded on SIGHUP.")
+
+
 async def post_init(application: Application) -> None:
     """Called by PTB after the app is initialised, within its event loop."""
     db.init_db()
     logger.info("Database initialised.")
     await application.bot.set_my_commands(PUBLIC_COMMANDS)
-    operator_id = cfg.load()["telegram"].get("operator_user_id")
+    operator_id = cfg.operator_id()
     if operator_id:
         await application.bot.set_my_commands(
             OPERATOR_COMMANDS, scope=BotCommandScopeChat(chat_id=operator_id)
         )
     logger.info("Bot command menu registered.")
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_config)
+    except (AttributeError, NotImplementedError):
+        pass  # no SIGHUP / loop signal handlers on Windows
     start_scheduler(application.bot)
 
 
@@ -134,7 +148,7 @@ async def error_handler(update: object, context) -> None:
 
 def main() -> None:
     # Seed volume files from base64 env vars if they're missing. Runs before
-    # config.load() and GmailClient() so subsequent steps find the files.
+    # config.load() and the Gmail client so subsequent steps find the files.
     _bootstrap_volume_files()
 
     token = cfg.TELEGRAM_BOT_TOKEN
@@ -144,19 +158,23 @@ def main() -> None:
     # Trigger Gmail OAuth consent flow now, synchronously, before the async
     # event loop starts. run_local_server() blocks until the browser callback
     # completes. On subsequent runs it just loads the saved token silently.
-    from gmail_client import GmailClient
+    import gmail_client
     logger.info("Initialising Gmail client (OAuth flow if first run)...")
-    GmailClient()
+    gmail_client.get_client()
     logger.info("Gmail client ready.")
 
     # Use separate HTTP clients for getUpdates vs all other API calls so the
     # long-polling connection never blocks scheduler-initiated sendMessage calls.
+    # Callback work runs in its own tasks alongside the scheduler, so several
+    # sends can be in flight at once: size the shared pool for that and wait
+    # a few seconds for a free connection instead of PTB's 1s PoolTimeout.
     app = (
         ApplicationBuilder()
         .token(token)
         .post_init(post_init)
         .request(HTTPXRequest(
-            connection_pool_size=8,
+            connection_pool_size=16,
+            pool_timeout=5,
             read_timeout=30,
             write_timeout=30,
             connect_timeout=15,
@@ -187,9 +205,7 @@ def main() -> None:
     app.add_handler(CommandHandler("list_categories", cmd_list_categories))
 
     # Button callbacks
-    app.add_handler(CallbackQueryHandler(cb_accept, pattern=r"^accept_"))
-    app.add_handler(CallbackQueryHandler(cb_decline, pattern=r"^decline_"))
-    app.add_handler(CallbackQueryHandler(cb_done, pattern=r"^done_"))
+    app.add_handler(CallbackQueryHandler(cb_reviewer_button, pattern=r"^(accept|decline|done)_"))
     app.add_handler(CallbackQueryHandler(cb_confirm_rejection, pattern=r"^confirm_rejection_"))
     app.add_handler(CallbackQueryHandler(cb_confirm_delete, pattern=r"^confirm_delete_"))
     app.add_error_handler(error_handler)
@@ -4,6 +4,7 @@ reviewers.py — Utilities for fetching/parsing the reviewer list.
 The canonical source is the local reviewers.md file (path from config.yaml).
 This module is a thin helper; llm.py reads the file directly.
 """
+import functools
 import re
 import logging
 
@@ -18,6 +19,9 @@ def parse_reviewers_md(content: str) -> dict:
     """
     Parse reviewers.md content into a structured dict.
 
+    Results are memoized per content string, so the returned dict is shared
+    between callers and must be treated as read-only.
+
     Expected format:
         ## Category Name
         ...description...
@@ -32,38 +36,61 @@ def parse_reviewers_md(content: str) -> dict:
             ...
         }
     """
+    return _parse_cached(content)
+
+
+# reviewers.md only changes on /add_reviewer, /remove_reviewer or a redeploy,
+# so a handful of entries covers the current and previous versions.
+@functools.lru_cache(maxsize=4)
+def _parse_cached(content: str) -> dict:
     result = {}
-    sections = _CATEGORY_RE.split(content)
-    # sections[0] is content before first ##; then alternating [category, body, ...]
-    it = iter(sections[1:])
-    for category in it:
-        body = next(it, "")
-        reviewer_match = _REVIEWER_LINE_RE.search(body)
-        reviewers = []
-        if reviewer_match:
-            reviewers = _USERNAME_RE.findall(reviewer_match.group(1))
-        description_lines = [
-            line for line in body.splitlines()
-            if line.strip() and not _REVIEWER_LINE_RE.match(line.strip())
-        ]
-        result[category.strip()] = {
-            "description": " ".join(description_lines).strip(),
-            "reviewers": reviewers,
-        }
+    category = None
+    description_lines: list[str] = []
+    reviewers: list[str] = []
+
+    def flush():
+        if category is not None:
+            result[category] = {
+                "description": " ".join(description_lines).strip(),
+                "reviewers": reviewers,
+            }
+
+    # Single pass over the lines; content before the first ## is ignored.
+    for line in content.splitlines():
+        if line.startswith("##"):
+            header = _CATEGORY_RE.match(line)
+            if header:
+                flush()
+                category = header.group(1).strip()
+                description_lines, reviewers = [], []
+                continue
+        if category is None:
+            continue
+        stripped = line.strip()
+        if not stripped:
+            continue
+        m = _REVIEWER_LINE_RE.search(stripped)
+        if m and not reviewers:
+            # First Reviewers line in the section wins
+            reviewers = _USERNAME_RE.findall(m.group(1))
+        if m and m.start() == 0:
+            continue
+        description_lines.append(line)
+    flush()
     return result
 
 
 def get_all_reviewer_usernames(content: str) -> list[str]:
     """Return a flat deduplicated list of all reviewer usernames."""
+    return list(_all_usernames_cached(content))
+
+
+@functools.lru_cache(maxsize=4)
+def _all_usernames_cached(content: str) -> tuple[str, ...]:
     parsed = parse_reviewers_md(content)
-    seen = set()
-    result = []
-    for cat in parsed.values():
-        for u in cat["reviewers"]:
-            if u not in seen:
-                seen.add(u)
-                result.append(u)
-    return result
+    return tuple(dict.fromkeys(
+        u for cat in parsed.values() for u in cat["reviewers"]
+    ))
 
 
 # ── Structured editing ───────────────────────────────────────────────────────
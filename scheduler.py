@@ -1,10 +1,12 @@
 """
 scheduler.py — APScheduler jobs: Gmail polling and follow-up checker.
 """
+import asyncio
 import logging
 import time
 from datetime import datetime, timezone
 
+from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 import config as cfg
@@ -14,6 +16,12 @@ import state
 logger = logging.getLogger(__name__)
 
 _DB_KEY = "last_gmail_checked_ts"
+# Gmail history cursor; while set, polls fetch only messages added since it.
+# Cleared by /delete so the next poll falls back to the timestamp search.
+_HISTORY_DB_KEY = "last_gmail_history_id"
+# Half the bot's connection_pool_size in main.py (16), so a burst of
+# follow-ups leaves connections free for handler replies.
+_FOLLOWUP_CONCURRENCY = 8
 
 
 def _load_last_checked_ts() -> float:
@@ -38,7 +46,13 @@ def start_scheduler(bot) -> None:
     config = cfg.load()
     poll_interval = config["gmail"].get("poll_interval_seconds", 300)
 
-    scheduler = AsyncIOScheduler()
+    # A poll that overruns its interval (e.g. several LLM picks) must not
+    # start a second overlapping run; late runs are coalesced into one and
+    # still fire if they're late by up to one interval.
+    scheduler = AsyncIOScheduler(
+        executors={"default": AsyncIOExecutor()},
+        job_defaults={"coalesce": True, "max_instances": 1},
+    )
 
     scheduler.add_job(
         _poll_gmail,
@@ -47,6 +61,7 @@ def start_scheduler(bot) -> None:
         args=[bot],
         id="gmail_poll",
         replace_existing=True,
+        misfire_grace_time=poll_interval,
     )
 
     scheduler.add_job(
@@ -56,6 +71,7 @@ def start_scheduler(bot) -> None:
         args=[bot],
         id="followup_checker",
         replace_existing=True,
+        misfire_grace_time=3600,
     )
 
     scheduler.add_job(
@@ -65,49 +81,95 @@ def start_scheduler(bot) -> None:
         args=[bot],
         id="content_request_checker",
         replace_existing=True,
+        misfire_grace_time=300,
+    )
+
+    scheduler.add_job(
+        _checkpoint_db,
+        trigger="interval",
+        minutes=5,
+        id="db_checkpoint",
+        replace_existing=True,
+        misfire_grace_time=300,
     )
 
     scheduler.start()
     logger.info(
         "Scheduler started. Gmail poll every %ds, follow-up check every 1h, "
-        "content request check every 5m.",
+        "content request check and DB checkpoint every 5m.",
         poll_interval,
     )
 
 
 async def _poll_gmail(bot) -> None:
-    from gmail_client import GmailClient
+    import gmail_client
 
     config = cfg.load()
     operator_user_id = config["telegram"].get("operator_user_id")
-    last_checked_ts = _load_last_checked_ts()
+    last_checked_ts = await db.run(_load_last_checked_ts)
     # Capture poll start *before* the Gmail call so any message that arrives
     # during processing is picked up on the next poll (at worst re-fetched,
     # since gmail_message_id is UNIQUE in the DB).
     poll_start_ts = time.time()
 
     try:
-        gmail = GmailClient()
-        submissions = gmail.poll_new_submissions(
+        known_thread_ids, start_history_id = await asyncio.gather(
+            db.run(db.get_submission_thread_ids),
+            db.run(db.get_state, _HISTORY_DB_KEY),
+        )
+        # The Gmail API client is blocking; keep it off the event loop.
+        submissions, history_id = await asyncio.to_thread(
+            gmail_client.get_client().poll_new_submissions,
             last_checked_ts,
             subject_prefix=config["gmail"].get("subject_prefix"),
             submission_label=config["gmail"].get("submission_label"),
+            known_thread_ids=known_thread_ids,
+            start_history_id=start_history_id,
         )
 
+        # Without an operator to ask for drafts, reviewers are assigned
+        # straight away. The LLM picks don't depend on the insert, so start
+        # them first and let the request run while the rows are written.
+        picks_task = asyncio.create_task(
+            state.prefetch_assignments(submissions, config)
+        )
+        # One transaction for all inserts; the per-submission notification
+        # and assignment work (network I/O) happens afterwards.
+        try:
+            inserted = await db.run(state.insert_new_submissions, submissions)
+        except Exception:
+            picks_task.cancel()
+            raise
+        picks = await picks_task
+
+        # Handle submissions concurrently (each one waits on an LLM call),
+        # bounded so a large poll doesn't burst past the OpenAI rate limits.
+        max_concurrency = (config.get("llm") or {}).get("max_concurrency", 4)
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _handle_one(sub_id: int, email_data: dict) -> None:
+            async with sem:
+                await state.handle_new_submission(sub_id, email_data, bot, config,
+                                                  assignment=picks.get(email_data["gmail_message_id"]))
+
+        results = await asyncio.gather(
+            *(_handle_one(sub_id, email_data) for sub_id, email_data in inserted),
+            return_exceptions=True,
+        )
         all_ok = True
-        for email_data in submissions:
-            try:
-                await state.handle_new_submission(email_data, bot, config)
-            except Exception as e:
+        for result in results:
+            if isinstance(result, Exception):
                 all_ok = False
-                logger.error("Error handling new submission: %s", e, exc_info=e)
+                logger.error("Error handling new submission: %s", result, exc_info=result)
 
-        # Only advance the watermark if every submission was processed.
+        # Only advance the watermarks if every submission was processed.
         # On partial failure we re-scan the window next poll; the UNIQUE
         # constraint on gmail_message_id makes re-processing a no-op for
         # submissions that were inserted successfully.
         if all_ok:
-            _save_last_checked_ts(poll_start_ts)
+            await db.run(_save_last_checked_ts, poll_start_ts)
+            if history_id:
+                await db.run(db.set_state, _HISTORY_DB_KEY, str(history_id))
 
     except Exception as e:
         logger.error("Gmail polling failed: %s", e)
@@ -127,10 +189,11 @@ async def _check_content_requests(bot) -> None:
     now = datetime.now(timezone.utc)
 
     try:
-        expired = db.get_expired_content_requests(now)
+        expired = await db.run(db.get_expired_content_requests, now)
         for row in expired:
             try:
-                await state.handle_content_timeout(row["submission_id"], bot, config)
+                await state.locked(row["submission_id"], state.handle_content_timeout,
+                                   row["submission_id"], bot, config)
             except Exception as e:
                 logger.error(
                     "Error handling content request timeout for submission #%s: %s",
@@ -146,15 +209,29 @@ async def _check_followups(bot) -> None:
     now = datetime.now(timezone.utc)
 
     try:
-        due = db.get_pending_followups(now)
-        for followup in due:
-            try:
-                await state.send_followup(followup, bot, config)
-            except Exception as e:
-                logger.error(
-                    "Error sending follow-up for submission #%s: %s",
-                    followup["submission_id"],
-                    e,
-                )
+        due = await db.run(db.get_pending_followups, now)
+        # Follow-ups are independent Telegram sends; run them concurrently,
+        # bounded by the bot's HTTP connection pool.
+        sem = asyncio.Semaphore(_FOLLOWUP_CONCURRENCY)
+
+        async def _send_one(followup) -> None:
+            async with sem:
+                try:
+                    await state.send_followup(followup, bot, config)
+                except Exception as e:
+                    logger.error(
+                        "Error sending follow-up for submission #%s: %s",
+                        followup["submission_id"],
+                        e,
+                    )
+
+        await asyncio.gather(*(_send_one(followup) for followup in due))
     except Exception as e:
         logger.error("Follow-up checker failed: %s", e)
+
+
+async def _checkpoint_db() -> None:
+    try:
+        await db.run(db.checkpoint)
+    except Exception as e:
+        logger.error("DB checkpoint failed: %s", e)
@@ -4,11 +4,14 @@ state.py — State machine transitions and business logic for the TEM review bot
 All functions that change submission state live here. They call db.py for
 persistence and return data/messages for the Telegram layer to post.
 """
-import json
+import asyncio
+import functools
 import logging
+import weakref
 from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-import pytz
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 import db
 import llm
@@ -16,6 +19,28 @@ import llm
 logger = logging.getLogger(__name__)
 
 
+# ── Per-submission serialization ─────────────────────────────────────────────
+
+# Button callbacks run as tasks of their own, so handlers for one submission
+# can overlap at every await (an accept landing while a decline is still
+# picking a replacement, two declines taking the same fallback). Everything
+# that changes a submission's state goes through locked() instead, which runs
+# them one at a time per submission. Entries drop out once no task holds or
+# waits on the lock.
+_submission_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+async def locked(sub_id: int, fn, *args, **kwargs):
+    """await fn(*args, **kwargs) while holding sub_id's lock."""
+    lock = _submission_locks.get(sub_id)
+    if lock is None:
+        lock = _submission_locks[sub_id] = asyncio.Lock()
+    async with lock:
+        return await fn(*args, **kwargs)
+
+
 # ── Operator Notifications ───────────────────────────────────────────────────
 
 async def notify_operator(bot, config: dict, text: str) -> None:
@@ -29,71 +54,207 @@ async def notify_operator(bot, config: dict, text: str) -> None:
         logger.warning("Failed to notify operator: %s", e)
 
 
+async def _email_author(send, what: str) -> None:
+    """
+    Run a blocking Gmail send in a worker thread, e.g.
+    `_email_author(lambda gmail: gmail.send_acceptance_email(...), "acceptance")`.
+    Failures are logged, not raised, so callers can gather this with their
+    Telegram posts.
+    """
+    import gmail_client
+    try:
+        await asyncio.to_thread(lambda: send(gmail_client.get_client()))
+    except Exception as e:
+        logger.error("Failed to send %s email: %s", what, e)
+
+
+def _mentions(users: list[str], sep: str = " ") -> str:
+    """["a", "b"] → "@a @b" (or "@a, @b" with sep=", "); "" for no users."""
+    return "@" + (sep + "@").join(users) if users else ""
+
+
+def _latest_assignment(assignments, username: str):
+    """
+    Newest of `assignments` for `username` (case-insensitive, leading @
+    ignored) — the in-memory equivalent of db.get_assignment.
+    """
+    key = username.strip().lstrip("@").lower()
+    rows = [a for a in assignments if a["reviewer_tg_username"] == key]
+    return max(rows, key=lambda a: a["id"]) if rows else None
+
+
 # ── Follow-up scheduling helpers ─────────────────────────────────────────────
 
-def _schedule_acceptance_followup(sub_id: int, config: dict) -> None:
+def _schedule_acceptance_followup_on(conn, sub_id: int, config: dict) -> None:
     """Replace any unsent acceptance follow-up for this submission with a fresh one."""
     hours = config["workflow"].get("acceptance_followup_interval_hours", 24)
-    db.clear_unsent_followups(sub_id, kind="acceptance")
-    next_at = datetime.now(timezone.utc) + timedelta(hours=hours)
-    db.insert_followup(sub_id, next_at, kind="acceptance")
+    db.clear_unsent_followups_on(conn, sub_id, kind="acceptance")
+    db.schedule_followup_on(conn, sub_id, hours, kind="acceptance")
+
+
+def _schedule_acceptance_followup(sub_id: int, config: dict) -> None:
+    with db.transaction() as conn:
+        _schedule_acceptance_followup_on(conn, sub_id, config)
+
+
+def _mark_sent_and_reschedule(followup_id: int, sub_id: int, hours: float,
+                              kind: str) -> None:
+    """Close out a sent follow-up and queue the next one in one transaction."""
+    with db.transaction() as conn:
+        db.mark_followup_sent_on(conn, followup_id)
+        db.schedule_followup_on(conn, sub_id, hours, kind=kind)
+
+
+# ── Keyboards ────────────────────────────────────────────────────────────────
+
+def _build_reviewer_prompt_keyboard(sub_id: int, reviewers: list[str]) -> InlineKeyboardMarkup:
+    """Yes / Can't buttons, one row per reviewer."""
+    # callback_data is "<action>_<sub_id>_<username>"; format the shared
+    # middle once rather than per button. Usernames go out lower-cased so the
+    # callback only has to lower the clicking user's name.
+    pfx = f"_{sub_id}_"
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"✅ @{r} — Yes", callback_data="accept" + pfx + r.lower()),
+            InlineKeyboardButton(f"❌ @{r} — Can't", callback_data="decline" + pfx + r.lower()),
+        ]
+        for r in reviewers
+    ])
+
+
+def _build_done_keyboard(sub_id: int, reviewers: list[str]) -> InlineKeyboardMarkup:
+    """One "mark my review as done" button per reviewer."""
+    pfx = f"done_{sub_id}_"
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            f"✅ Mark my review as done — @{r}",
+            callback_data=pfx + r.lower()
+        )]
+        for r in reviewers
+    ])
+
+
+_REVIEWER_BUTTON_ACTIONS = frozenset(("accept", "decline", "done"))
+
+
+def parse_reviewer_callback(data: str):
+    """
+    Inverse of the two builders above: (action, sub_id, username), or None
+    when data isn't one of their buttons. Usernames may contain "_", so only
+    the first two separators count.
+    """
+    action, _, rest = data.partition("_")
+    sub_id, _, username = rest.partition("_")
+    if (action not in _REVIEWER_BUTTON_ACTIONS or not username
+            or not (sub_id.isascii() and sub_id.isdigit())):
+        return None
+    return action, int(sub_id), username
 
 
 # ── Publish Date ─────────────────────────────────────────────────────────────
 
+@functools.lru_cache(maxsize=8)
+def _tz(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
 def compute_publish_date(timezone_str: str = "Asia/Taipei",
                          publish_time_str: str = "09:30") -> datetime:
-    tz = pytz.timezone(timezone_str)
-    now = datetime.now(tz)
+    now = datetime.now(_tz(timezone_str))
     candidate = now + timedelta(days=1)
     while candidate.weekday() >= 5:  # 5=Saturday, 6=Sunday
         candidate += timedelta(days=1)
-    hour, minute = int(publish_time_str.split(":")[0]), int(publish_time_str.split(":")[1])
+    hour, minute = map(int, publish_time_str.split(":"))
     publish_dt = candidate.replace(hour=hour, minute=minute, second=0, microsecond=0)
     return publish_dt
 
 
 # ── New Submission ────────────────────────────────────────────────────────────
 
-async def handle_new_submission(email_data: dict, bot, config: dict) -> None:
+def insert_new_submissions(submissions: list[dict]) -> list[tuple[int, dict]]:
     """
-    Called by the Gmail poller when a new submission email arrives.
-    If operator_user_id is set: insert as pending_content, DM operator for draft.
-    Otherwise: proceed directly to LLM assignment.
+    Insert every submission from one Gmail poll in a single transaction.
+    Already-known emails (same gmail_message_id) are skipped.
+    Returns [(sub_id, email_data), ...] for the rows actually inserted.
     """
-    # Avoid duplicate processing
-    existing = db.get_submission_by_gmail_id(email_data["gmail_message_id"])
-    if existing:
-        logger.info("Submission %s already processed, skipping.",
-                    email_data["gmail_message_id"])
-        return
+    inserted = []
+    with db.transaction() as conn:
+        for email_data in submissions:
+            sub_id = db.insert_submission_on(
+                conn,
+                gmail_message_id=email_data["gmail_message_id"],
+                gmail_thread_id=email_data.get("gmail_thread_id"),
+                title=email_data["title"],
+                author_name=email_data.get("author_name", ""),
+                author_email=email_data["author_email"],
+                medium_url=email_data.get("medium_url"),
+                email_subject=email_data["email_subject"],
+                email_body=email_data.get("email_body", ""),
+                message_id_header=email_data.get("message_id_header") or None,
+            )
+            if sub_id is None:
+                logger.info("Submission %s already processed, skipping.",
+                            email_data["gmail_message_id"])
+                continue
+            logger.info("Inserted submission #%d: %s", sub_id, email_data["title"])
+            inserted.append((sub_id, email_data))
+    return inserted
+
+
+async def prefetch_assignments(submissions: list[dict],
+                               config: dict) -> dict[str, dict]:
+    """
+    When submissions go straight to assignment (no operator to ask for
+    drafts), pick reviewers for everything from one poll up front —
+    batched into as few LLM calls as possible. Needs nothing from the DB,
+    so the poller runs it alongside insert_new_submissions.
+    Returns {gmail_message_id: assignment}; anything missing falls back to a
+    per-submission pick in _proceed_with_assignment.
+    """
+    if config["telegram"].get("operator_user_id") or not submissions:
+        return {}
+    try:
+        if len(submissions) == 1:
+            email_data = submissions[0]
+            return {email_data["gmail_message_id"]:
+                    await llm.pick_reviewers(email_data, config=config)}
+        picks = await llm.pick_reviewers_batch(list(enumerate(submissions, 1)), config)
+    except Exception as e:
+        logger.warning("Up-front reviewer assignment failed, picking one by one: %s", e)
+        return {}
+    return {submissions[i - 1]["gmail_message_id"]: pick for i, pick in picks.items()}
 
-    sub_id = db.insert_submission(
-        gmail_message_id=email_data["gmail_message_id"],
-        gmail_thread_id=email_data.get("gmail_thread_id"),
-        title=email_data["title"],
-        author_name=email_data.get("author_name", ""),
-        author_email=email_data["author_email"],
-        medium_url=email_data.get("medium_url"),
-        email_subject=email_data["email_subject"],
-        email_body=email_data.get("email_body", ""),
-    )
-    logger.info("Inserted submission #%d: %s", sub_id, email_data["title"])
 
+async def handle_new_submission(sub_id: int, email_data: dict, bot, config: dict,
+                                assignment: dict | None = None) -> None:
+    """
+    Called by the Gmail poller for each submission inserted by insert_new_submissions.
+    If operator_user_id is set: mark as pending_content, DM operator for draft.
+    Otherwise: proceed directly to LLM assignment, using `assignment` from
+    prefetch_assignments when given.
+    """
     operator_user_id = config["telegram"].get("operator_user_id")
     if not operator_user_id:
         logger.warning(
             "operator_user_id not set — skipping content request, assigning directly."
         )
-        await _proceed_with_assignment(sub_id, email_data, "", bot, config)
+        await _proceed_with_assignment(sub_id, email_data, "", bot, config,
+                                       assignment=assignment)
         return
 
     # Set status to pending_content and DM the operator
-    db.update_submission_status(sub_id, "pending_content")
     deadline = datetime.now(timezone.utc) + timedelta(hours=24)
-    db.insert_content_request(sub_id, deadline)
 
-    tz = pytz.timezone(config["workflow"].get("publish_timezone", "Asia/Taipei"))
+    # One transaction: with DB work on the pool, /content or /skip could
+    # otherwise run between the two writes and find no content request.
+    def _request_content():
+        with db.transaction() as conn:
+            db.update_submission_status_on(conn, sub_id, "pending_content")
+            db.insert_content_request_on(conn, sub_id, deadline)
+
+    await db.run(_request_content)
+
+    tz = _tz(config["workflow"].get("publish_timezone", "Asia/Taipei"))
     deadline_local = deadline.astimezone(tz).strftime("%Y-%m-%d %H:%M %Z")
 
     dm_text = (
@@ -131,14 +292,16 @@ async def handle_new_submission(email_data: dict, bot, config: dict) -> None:
 
 
 async def _proceed_with_assignment(sub_id: int, email_data: dict,
-                                    article_content: str, bot, config: dict) -> None:
+                                    article_content: str, bot, config: dict,
+                                    assignment: dict | None = None) -> None:
     """
     Call LLM, post group announcement, and send reviewer buttons.
     Called after content is received, skipped, or timed out.
     """
     try:
-        assignment = await llm.pick_reviewers(email_data, config=config,
-                                               article_content=article_content)
+        if assignment is None:
+            assignment = await llm.pick_reviewers(email_data, config=config,
+                                                   article_content=article_content)
     except Exception as e:
         logger.error("LLM reviewer assignment failed: %s", e, exc_info=e)
         group_chat_id = config["telegram"]["group_chat_id"]
@@ -167,16 +330,18 @@ async def _proceed_with_assignment(sub_id: int, email_data: dict,
     # reviewer2 may be "" if only one reviewer is available for this category
     reviewers = [r.strip() for r in [assignment["reviewer1"], assignment.get("reviewer2", "")] if r and r.strip()]
 
-    for r in reviewers:
-        db.insert_assignment(sub_id, r)
-    db.update_submission_status(sub_id, "assigning")
-    _schedule_acceptance_followup(sub_id, config)
+    def _record_assignment():
+        with db.transaction() as conn:
+            db.bulk_insert_assignments_on(conn, sub_id, reviewers)
+            db.set_reviewer_fallbacks_on(conn, sub_id, assignment.get("fallbacks", []))
+            db.update_submission_status_on(conn, sub_id, "assigning")
+            _schedule_acceptance_followup_on(conn, sub_id, config)
 
     group_chat_id = config["telegram"]["group_chat_id"]
 
     # Post announcement message
     medium_line = f"\n{email_data['medium_url']}" if email_data.get("medium_url") else ""
-    reviewers_mention = " ".join(f"@{r}" for r in reviewers)
+    reviewers_mention = _mentions(reviewers)
     announcement = (
         f"📬 New submission received (#{sub_id})\n\n"
         f"《{email_data['title']}》\n"
@@ -186,23 +351,18 @@ async def _proceed_with_assignment(sub_id: int, email_data: dict,
         f"{reviewers_mention}\n\n"
         f"Reason: {reason_zh}"
     )
+    # Commit the assignment before announcing it, so the group is never told
+    # about reviewers that were not recorded.
+    await db.run(_record_assignment)
     await bot.send_message(chat_id=group_chat_id, text=announcement)
 
     # Post reviewer request with inline buttons (one row per reviewer)
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-    keyboard = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton(f"✅ @{r} — Yes", callback_data=f"accept_{sub_id}_{r}"),
-            InlineKeyboardButton(f"❌ @{r} — Can't", callback_data=f"decline_{sub_id}_{r}"),
-        ]
-        for r in reviewers
-    ])
     msg = await bot.send_message(
         chat_id=group_chat_id,
         text=f"{reviewers_mention} — are you available to review 《{email_data['title']}》?",
-        reply_markup=keyboard,
+        reply_markup=_build_reviewer_prompt_keyboard(sub_id, reviewers),
     )
-    db.set_tg_status_message_id(sub_id, msg.message_id)
+    await db.run(db.set_tg_status_message_id, sub_id, msg.message_id)
 
 
 async def handle_content_provided(sub_id: int, article_content: str,
@@ -211,11 +371,11 @@ async def handle_content_provided(sub_id: int, article_content: str,
     Called when the operator provides content (/content) or skips (/skip).
     Proceeds to LLM assignment.
     """
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub or sub["status"] != "pending_content":
         return
 
-    db.delete_content_request(sub_id)
+    await db.run(db.delete_content_request, sub_id)
 
     email_data = {
         "gmail_message_id": sub["gmail_message_id"],
@@ -235,7 +395,7 @@ async def handle_content_timeout(sub_id: int, bot, config: dict) -> None:
     Called by the scheduler when a content request deadline expires.
     Proceeds to LLM assignment without content.
     """
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub or sub["status"] != "pending_content":
         return  # Already handled by operator
 
@@ -245,7 +405,7 @@ async def handle_content_timeout(sub_id: int, bot, config: dict) -> None:
         f"⏰ Content request for #{sub_id} 《{sub['title']}》 timed out. "
         f"Proceeding with title-only assignment."
     )
-    db.delete_content_request(sub_id)
+    await db.run(db.delete_content_request, sub_id)
 
     email_data = {
         "gmail_message_id": sub["gmail_message_id"],
@@ -268,44 +428,46 @@ async def handle_reviewer_accept(sub_id: int, username: str, tg_user_id: int,
     Returns a string to show in the callback answer (toast).
     Posts group messages and transitions state as needed.
     """
-    assignment = db.get_assignment(sub_id, username)
+    assignment = await db.run(db.get_assignment, sub_id, username)
     if not assignment:
         return "Assignment not found."
 
-    if assignment["status"] != "pending":
+    if assignment["status"] != "pending" or not await db.run(
+            db.update_assignment_status, sub_id, username, "confirmed",
+            tg_user_id, from_status="pending"):
         return "Already recorded!"
 
-    db.update_assignment_status(sub_id, username, "confirmed", tg_user_id)
-
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     await notify_operator(
         bot, config,
         f"✅ @{username} accepted review for #{sub_id} 《{sub['title']}》."
     )
 
-    all_assignments = db.get_assignments_for_submission(sub_id)
-    active = [a for a in all_assignments if a["status"] != "declined"]
-    still_pending = [a for a in active if a["status"] == "pending"]
+    counts = await db.run(db.count_assignment_states, sub_id)
 
-    # Transition when every active slot is confirmed (works for 1 or 2 reviewers)
-    if not still_pending and active:
-        await _transition_to_under_review(sub_id, bot, config)
+    # Transition when every active (non-declined) slot is confirmed
+    # (works for 1 or 2 reviewers). Accept buttons run as concurrent tasks, so
+    # two last accepts can both see pending == 0; only one gets to move the
+    # submission out of 'assigning'.
+    if not counts["pending"] and counts["confirmed"] + counts["done"]:
+        await _transition_to_under_review(sub_id, bot, config,
+                                          from_status="assigning")
 
     return "✅ Confirmed! Thank you."
 
 
 async def handle_reviewer_decline(sub_id: int, username: str, tg_user_id: int,
                                    bot, config: dict) -> str:
-    assignment = db.get_assignment(sub_id, username)
+    sub, existing_assignments = await db.run(db.get_submission_with_assignments, sub_id)
+    assignment = _latest_assignment(existing_assignments, username)
     if not assignment:
         return "Assignment not found."
 
-    if assignment["status"] not in ("pending",):
+    if assignment["status"] not in ("pending",) or not await db.run(
+            db.update_assignment_status, sub_id, username, "declined",
+            tg_user_id, from_status="pending"):
         return "Already recorded!"
 
-    db.update_assignment_status(sub_id, username, "declined", tg_user_id)
-
-    sub = db.get_submission_by_id(sub_id)
     await notify_operator(
         bot, config,
         f"❌ @{username} declined review for #{sub_id} 《{sub['title']}》. "
@@ -313,8 +475,8 @@ async def handle_reviewer_decline(sub_id: int, username: str, tg_user_id: int,
     )
     group_chat_id = config["telegram"]["group_chat_id"]
 
-    # Find a replacement
-    existing_assignments = db.get_assignments_for_submission(sub_id)
+    # Find a replacement. Everyone already on the submission is excluded
+    # whatever their status, so the pre-update rows are enough.
     excluded = [a["reviewer_tg_username"] for a in existing_assignments]
 
     email_data = {
@@ -328,28 +490,29 @@ async def handle_reviewer_decline(sub_id: int, username: str, tg_user_id: int,
     }
 
     try:
-        assignment_result = await llm.pick_replacement_reviewer(
-            email_data=email_data,
-            declined_username=username,
-            excluded_usernames=excluded,
+        # Use the ranked fallbacks from the original pick when one is still
+        # available; only ask the LLM again once they're exhausted.
+        new_reviewer = llm.next_fallback_reviewer(
+            await db.run(db.get_reviewer_fallbacks, sub_id), excluded, config
         )
-        new_reviewer = assignment_result["reviewer1"].strip()
-        if not new_reviewer or new_reviewer.lower() in [e.lower() for e in excluded]:
-            raise ValueError(f"LLM returned excluded or empty reviewer: '{new_reviewer}'")
-        db.insert_assignment(sub_id, new_reviewer)
-        _schedule_acceptance_followup(sub_id, config)
-
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-        keyboard = InlineKeyboardMarkup([[
-            InlineKeyboardButton(
-                f"✅ @{new_reviewer} — Yes",
-                callback_data=f"accept_{sub_id}_{new_reviewer}"
-            ),
-            InlineKeyboardButton(
-                f"❌ @{new_reviewer} — Can't",
-                callback_data=f"decline_{sub_id}_{new_reviewer}"
-            ),
-        ]])
+        if new_reviewer:
+            logger.info("Using stored fallback @%s for submission #%s",
+                        new_reviewer, sub_id)
+        else:
+            assignment_result = await llm.pick_replacement_reviewer(
+                email_data=email_data,
+                declined_username=username,
+                excluded_usernames=excluded,
+            )
+            new_reviewer = assignment_result["reviewer1"].strip()
+            if not new_reviewer or new_reviewer.lower() in [e.lower() for e in excluded]:
+                raise ValueError(f"LLM returned excluded or empty reviewer: '{new_reviewer}'")
+            await db.run(db.set_reviewer_fallbacks, sub_id,
+                         assignment_result.get("fallbacks", []))
+        await db.run(db.insert_assignment, sub_id, new_reviewer)
+        await db.run(_schedule_acceptance_followup, sub_id, config)
+
+        keyboard = _build_reviewer_prompt_keyboard(sub_id, [new_reviewer])
         await bot.send_message(
             chat_id=group_chat_id,
             text=(
@@ -371,8 +534,8 @@ async def handle_reviewer_decline(sub_id: int, username: str, tg_user_id: int,
             except Exception as notify_err:
                 logger.error("Failed to notify operator: %s", notify_err)
         # Build a pre-filled /override command showing already-confirmed reviewers
-        confirmed = db.get_confirmed_reviewers(sub_id)
-        confirmed_mentions = " ".join(f"@{a['reviewer_tg_username']}" for a in confirmed)
+        confirmed = await db.run(db.get_confirmed_reviewers, sub_id)
+        confirmed_mentions = _mentions([a["reviewer_tg_username"] for a in confirmed])
         override_example = f"/override {sub_id} {confirmed_mentions} @new_reviewer".strip()
         await bot.send_message(
             chat_id=group_chat_id,
@@ -391,92 +554,89 @@ async def handle_reviewer_decline(sub_id: int, username: str, tg_user_id: int,
 
 # ── Transition to Under Review ────────────────────────────────────────────────
 
-async def _transition_to_under_review(sub_id: int, bot, config: dict) -> None:
-    from gmail_client import GmailClient
-    import config as cfg
+async def _transition_to_under_review(sub_id: int, bot, config: dict,
+                                      from_status: str | None = None) -> None:
+    """
+    With from_status, only a submission still in that status moves on; a
+    concurrent caller that lost the race returns without announcing anything.
+    """
+    followup_days = config["workflow"]["followup_interval_days"]
 
-    import asyncio
-    sub = db.get_submission_by_id(sub_id)
-    confirmed = db.get_confirmed_reviewers(sub_id)
+    def _start_review():
+        # Status change, acceptance follow-up cleanup and the first review
+        # follow-up are committed together.
+        with db.transaction() as conn:
+            if not db.update_submission_status_on(conn, sub_id, "under_review",
+                                                  from_status=from_status):
+                return None, None
+            db.clear_unsent_followups_on(conn, sub_id, kind="acceptance")
+            db.schedule_followup_on(conn, sub_id, followup_days * 24)
+        return db.get_submission_by_id(sub_id), db.get_confirmed_reviewers(sub_id)
+
+    sub, confirmed = await db.run(_start_review)
+    if sub is None:
+        return
     reviewers = [a["reviewer_tg_username"] for a in confirmed]
 
-    db.update_submission_status(sub_id, "under_review")
-    db.clear_unsent_followups(sub_id, kind="acceptance")
-
-    await notify_operator(
-        bot, config,
-        f"📖 #{sub_id} 《{sub['title']}》 is now under review. "
-        f"Reviewers: {', '.join(f'@{r}' for r in reviewers)}. Author notified."
-    )
-
     group_chat_id = config["telegram"]["group_chat_id"]
 
-    # Schedule first follow-up
-    followup_days = config["workflow"]["followup_interval_days"]
-    next_followup = datetime.now(timezone.utc) + timedelta(days=followup_days)
-    db.insert_followup(sub_id, next_followup)
-
-    # Send "under review" email to submitter (run blocking Gmail call in thread)
-    try:
-        gmail = GmailClient()
-        await asyncio.to_thread(gmail.send_under_review_email, dict(sub))
-    except Exception as e:
-        logger.error("Failed to send under-review email: %s", e)
-
-    # Post group message with done buttons (one per reviewer)
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(
-            f"✅ Mark my review as done — @{r}",
-            callback_data=f"done_{sub_id}_{r}"
-        )]
-        for r in reviewers
-    ])
+    # Group message with done buttons (one per reviewer)
+    keyboard = _build_done_keyboard(sub_id, reviewers)
     reviewer_lines = "\n".join(f"Reviewer {i+1}: @{r}" for i, r in enumerate(reviewers))
     count_word = "All reviewers" if len(reviewers) > 1 else "Reviewer"
-    msg = await bot.send_message(
-        chat_id=group_chat_id,
-        text=(
-            f"✅ {count_word} confirmed for 《{sub['title']}》\n"
-            f"{reviewer_lines}\n\n"
-            f"Submission status updated to \"Under Review\". Author has been notified.\n\n"
-            f"When you've finished your review, click the button below or "
-            f"type /done <keyword> (use any word from the title)"
+
+    # The operator DM, the "under review" email to the submitter and the
+    # group post are independent — send them concurrently.
+    _, _, msg = await asyncio.gather(
+        notify_operator(
+            bot, config,
+            f"📖 #{sub_id} 《{sub['title']}》 is now under review. "
+            f"Reviewers: {_mentions(reviewers, ', ')}. Author notified."
+        ),
+        _email_author(lambda gmail: gmail.send_under_review_email(dict(sub)),
+                      "under-review"),
+        bot.send_message(
+            chat_id=group_chat_id,
+            text=(
+                f"✅ {count_word} confirmed for 《{sub['title']}》\n"
+                f"{reviewer_lines}\n\n"
+                f"Submission status updated to \"Under Review\". Author has been notified.\n\n"
+                f"When you've finished your review, click the button below or "
+                f"type /done <keyword> (use any word from the title)"
+            ),
+            reply_markup=keyboard,
         ),
-        reply_markup=keyboard,
     )
-    db.set_tg_status_message_id(sub_id, msg.message_id)
+    await db.run(db.set_tg_status_message_id, sub_id, msg.message_id)
 
 
 # ── Reviewer Done ─────────────────────────────────────────────────────────────
 
 async def handle_reviewer_done(sub_id: int, username: str, tg_user_id: int,
                                 bot, config: dict) -> str:
-    sub = db.get_submission_by_id(sub_id)
+    sub, assignments = await db.run(db.get_submission_with_assignments, sub_id)
     if not sub:
         return "Submission not found."
 
     if sub["status"] not in ("under_review", "assigning"):
         return "This submission is not currently under review."
 
-    assignment = db.get_assignment(sub_id, username)
+    assignment = _latest_assignment(assignments, username)
     if not assignment:
         return f"You (@{username}) are not assigned to this submission."
 
     if assignment["status"] == "done":
         return "Already recorded!"
 
-    db.mark_assignment_done(sub_id, username, tg_user_id)
+    all_assignments = await db.run(db.mark_assignment_done, sub_id, username, tg_user_id)
+    if all_assignments is None:
+        return "Already recorded!"
 
     await notify_operator(
         bot, config,
         f"✅ @{username} marked review done for #{sub_id} 《{sub['title']}》."
     )
 
-    done_reviewers = db.get_done_reviewers(sub_id)
-    confirmed_reviewers = db.get_confirmed_reviewers(sub_id)
-    # After marking done, re-fetch
-    all_assignments = db.get_assignments_for_submission(sub_id)
     # Active reviewers = confirmed + done (not declined, not still pending)
     active = [a for a in all_assignments if a["status"] in ("confirmed", "done")]
     done_list = [a for a in active if a["status"] == "done"]
@@ -492,7 +652,7 @@ async def handle_reviewer_done(sub_id: int, username: str, tg_user_id: int,
             if a["status"] == "confirmed" and a["reviewer_tg_username"] != username
         ]
         if still_pending:
-            waiting = ", ".join(f"@{u}" for u in still_pending)
+            waiting = _mentions(still_pending, ", ")
             await bot.send_message(
                 chat_id=group_chat_id,
                 text=(
@@ -506,27 +666,21 @@ async def handle_reviewer_done(sub_id: int, username: str, tg_user_id: int,
 
 async def _transition_to_accepted(sub_id: int, done_assignments: list,
                                    bot, config: dict) -> None:
-    from gmail_client import GmailClient
-
-    sub = db.get_submission_by_id(sub_id)
     publish_dt = compute_publish_date(
         timezone_str=config["workflow"].get("publish_timezone", "Asia/Taipei"),
         publish_time_str=config["workflow"].get("publish_time", "09:30"),
     )
     publish_date_str = publish_dt.strftime("%Y-%m-%d")
 
-    db.set_submission_accepted(sub_id, publish_date_str)
+    def _accept():
+        db.set_submission_accepted(sub_id, publish_date_str)
+        return db.get_submission_by_id(sub_id)
+
+    sub = await db.run(_accept)
 
     publish_time_str = config["workflow"].get("publish_time", "09:30")
     publish_tz_str = config["workflow"].get("publish_timezone", "Asia/Taipei")
 
-    await notify_operator(
-        bot, config,
-        f"🎉 #{sub_id} 《{sub['title']}》 accepted. Author notified.\n\n"
-        f"📌 Action needed: please schedule publishing on Medium for "
-        f"{publish_date_str} {publish_time_str} ({publish_tz_str})."
-    )
-
     group_chat_id = config["telegram"]["group_chat_id"]
     n = len(done_assignments)
     header = (
@@ -534,32 +688,40 @@ async def _transition_to_accepted(sub_id: int, done_assignments: list,
         if n >= 2
         else f"🎉 Review complete for 《{sub['title']}》!"
     )
-    await bot.send_message(
-        chat_id=group_chat_id,
-        text=(
-            f"{header}\n\n"
-            f"Suggested publish date: {publish_date_str} at "
-            f"{publish_time_str} ({publish_tz_str})\n\n"
-            f"Author has been notified."
+    await asyncio.gather(
+        notify_operator(
+            bot, config,
+            f"🎉 #{sub_id} 《{sub['title']}》 accepted. Author notified.\n\n"
+            f"📌 Action needed: please schedule publishing on Medium for "
+            f"{publish_date_str} {publish_time_str} ({publish_tz_str})."
+        ),
+        bot.send_message(
+            chat_id=group_chat_id,
+            text=(
+                f"{header}\n\n"
+                f"Suggested publish date: {publish_date_str} at "
+                f"{publish_time_str} ({publish_tz_str})\n\n"
+                f"Author has been notified."
+            ),
+        ),
+        _email_author(
+            lambda gmail: gmail.send_acceptance_email(dict(sub), publish_date_str),
+            "acceptance",
         ),
     )
 
-    try:
-        import asyncio
-        gmail = GmailClient()
-        await asyncio.to_thread(gmail.send_acceptance_email, dict(sub), publish_date_str)
-    except Exception as e:
-        logger.error("Failed to send acceptance email: %s", e)
-
 
 # ── Rejection Flow ────────────────────────────────────────────────────────────
 
 async def handle_rejection_proposal(sub_id: int, proposed_by: str,
                                      reason: str, bot, config: dict) -> None:
-    sub = db.get_submission_by_id(sub_id)
     group_chat_id = config["telegram"]["group_chat_id"]
 
-    rejection_id = db.insert_rejection(sub_id, proposed_by, reason)
+    def _propose():
+        return (db.get_submission_by_id(sub_id),
+                db.insert_rejection(sub_id, proposed_by, reason))
+
+    sub, rejection_id = await db.run(_propose)
 
     await notify_operator(
         bot, config,
@@ -577,11 +739,11 @@ async def handle_rejection_proposal(sub_id: int, proposed_by: str,
             f"(0/2 seconds so far)"
         ),
     )
-    db.set_rejection_proposal_message_id(rejection_id, msg.message_id)
+    await db.run(db.set_rejection_proposal_message_id, rejection_id, msg.message_id)
 
 
 async def handle_second(sub_id: int, username: str, bot, config: dict) -> str:
-    rejection = db.get_active_rejection(sub_id)
+    rejection = await db.run(db.get_active_rejection, sub_id)
     if not rejection:
         return "No active rejection proposal for this submission."
 
@@ -589,11 +751,11 @@ async def handle_second(sub_id: int, username: str, bot, config: dict) -> str:
         return "You can't second your own rejection proposal."
 
     rejection_id = rejection["id"]
-    seconds = db.add_second_to_rejection(rejection_id, username)
+    seconds = await db.run(db.add_second_to_rejection, rejection_id, username)
 
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     group_chat_id = config["telegram"]["group_chat_id"]
-    seconds_text = ", ".join(f"@{s}" for s in seconds)
+    seconds_text = _mentions(seconds, ", ")
     count = len(seconds)
 
     # Edit the original proposal message
@@ -616,7 +778,6 @@ async def handle_second(sub_id: int, username: str, bot, config: dict) -> str:
             f"⚠️ Rejection of #{sub_id} 《{sub['title']}》 has 2 seconds. "
             f"Your confirmation is required in the group."
         )
-        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
         keyboard = InlineKeyboardMarkup([[
             InlineKeyboardButton(
                 "✅ Confirm rejection",
@@ -645,30 +806,33 @@ async def handle_confirm_rejection(sub_id: int, operator_tg_id: int,
     if operator_user_id and operator_tg_id != operator_user_id:
         return "Only the operator can confirm rejection."
 
-    rejection = db.get_active_rejection(sub_id)
-    sub = db.get_submission_by_id(sub_id)
+    rejection, sub = await asyncio.gather(
+        db.run(db.get_active_rejection, sub_id),
+        db.run(db.get_submission_by_id, sub_id),
+    )
     if not sub:
         return "Submission not found."
     if not rejection:
         return "No active rejection proposal for this submission."
 
-    db.set_submission_rejected(sub_id)
+    await db.run(db.set_submission_rejected, sub_id)
 
     group_chat_id = config["telegram"]["group_chat_id"]
-    await bot.send_message(
-        chat_id=group_chat_id,
-        text=f"🚫 《{sub['title']}》 has been rejected.",
-    )
-
     reason = rejection["reason"] if rejection else ""
-    await notify_operator(
-        bot,
-        config,
-        (
-            f"🚫 Rejection confirmed for #{sub_id} 《{sub['title']}》.\n"
-            f"Author: {sub['author_name'] or '(unknown)'} <{sub['author_email']}>\n"
-            f"Reason: {reason or '(none)'}\n\n"
-            f"Please notify the author manually if needed."
+    await asyncio.gather(
+        bot.send_message(
+            chat_id=group_chat_id,
+            text=f"🚫 《{sub['title']}》 has been rejected.",
+        ),
+        notify_operator(
+            bot,
+            config,
+            (
+                f"🚫 Rejection confirmed for #{sub_id} 《{sub['title']}》.\n"
+                f"Author: {sub['author_name'] or '(unknown)'} <{sub['author_email']}>\n"
+                f"Reason: {reason or '(none)'}\n\n"
+                f"Please notify the author manually if needed."
+            ),
         ),
     )
 
@@ -679,52 +843,60 @@ async def handle_confirm_rejection(sub_id: int, operator_tg_id: int,
 
 async def handle_override(sub_id: int, new_reviewers: list[str],
                            bot, config: dict) -> str:
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub:
         return f"Submission #{sub_id} not found."
 
-    db.clear_pending_assignments(sub_id)
-
-    # Deduplicate the operator's input (case-insensitive) and skip anyone
-    # who already has a surviving assignment (confirmed/done), so listing
-    # an existing reviewer doesn't create a duplicate row.
-    existing = {
-        a["reviewer_tg_username"].lower()
-        for a in db.get_assignments_for_submission(sub_id)
-    }
-    added: list[str] = []
-    skipped_existing: list[str] = []
-    seen: set[str] = set()
-    for raw in new_reviewers:
-        username = raw.strip().lstrip("@")
-        if not username:
-            continue
-        key = username.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        if key in existing:
-            skipped_existing.append(username)
-            continue
-        db.insert_assignment(sub_id, username)
-        added.append(username)
-
-    # Re-evaluate status based on what actually remains after clear+insert.
-    remaining = db.get_assignments_for_submission(sub_id)
-    has_pending = any(a["status"] == "pending" for a in remaining)
-    has_confirmed = any(a["status"] == "confirmed" for a in remaining)
-
-    if has_pending:
-        db.update_submission_status(sub_id, "assigning")
-        _schedule_acceptance_followup(sub_id, config)
-    else:
-        db.clear_unsent_followups(sub_id, kind="acceptance")
-        if has_confirmed:
-            # No pending left and at least one confirmed reviewer — proceed.
-            await _transition_to_under_review(sub_id, bot, config)
-        else:
-            # No assignments at all — leave in 'assigning' and warn operator.
-            db.update_submission_status(sub_id, "assigning")
+    # Clear, insert and status re-evaluation share one transaction.
+    def _apply_override():
+        with db.transaction() as conn:
+            db.clear_pending_assignments_on(conn, sub_id)
+
+            # Deduplicate the operator's input (case-insensitive) and skip anyone
+            # who already has a surviving assignment (confirmed/done), so listing
+            # an existing reviewer doesn't create a duplicate row.
+            existing = {
+                a["reviewer_tg_username"].lower()
+                for a in db.get_assignments_for_submission_on(conn, sub_id)
+            }
+            added: list[str] = []
+            skipped_existing: list[str] = []
+            seen: set[str] = set()
+            for raw in new_reviewers:
+                username = raw.strip().lstrip("@")
+                if not username:
+                    continue
+                key = username.lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                if key in existing:
+                    skipped_existing.append(username)
+                    continue
+                added.append(username)
+            db.bulk_insert_assignments_on(conn, sub_id, added)
+
+            # Re-evaluate status based on what actually remains after clear+insert.
+            remaining = db.get_assignments_for_submission_on(conn, sub_id)
+            has_pending = any(a["status"] == "pending" for a in remaining)
+            has_confirmed = any(a["status"] == "confirmed" for a in remaining)
+
+            if has_pending:
+                db.update_submission_status_on(conn, sub_id, "assigning")
+                _schedule_acceptance_followup_on(conn, sub_id, config)
+            else:
+                db.clear_unsent_followups_on(conn, sub_id, kind="acceptance")
+                if not has_confirmed:
+                    # No assignments at all — leave in 'assigning' and warn operator.
+                    db.update_submission_status_on(conn, sub_id, "assigning")
+        return added, skipped_existing, remaining, has_pending, has_confirmed
+
+    (added, skipped_existing, remaining,
+     has_pending, has_confirmed) = await db.run(_apply_override)
+
+    if not has_pending and has_confirmed:
+        # No pending left and at least one confirmed reviewer — proceed.
+        await _transition_to_under_review(sub_id, bot, config)
 
     group_chat_id = config["telegram"]["group_chat_id"]
 
@@ -733,7 +905,7 @@ async def handle_override(sub_id: int, new_reviewers: list[str],
         if skipped_existing:
             note = (
                 f" Already assigned: "
-                f"{', '.join(f'@{u}' for u in skipped_existing)}."
+                f"{_mentions(skipped_existing, ', ')}."
             )
         if not remaining:
             note += " ⚠️ No reviewers remain — assign someone with /override."
@@ -741,24 +913,8 @@ async def handle_override(sub_id: int, new_reviewers: list[str],
             note += " All remaining reviewers already confirmed — transitioned to under_review."
         return f"Override: nothing to add.{note}"
 
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-
-    rows = [
-        [
-            InlineKeyboardButton(
-                f"✅ @{username} — Yes",
-                callback_data=f"accept_{sub_id}_{username}"
-            ),
-            InlineKeyboardButton(
-                f"❌ @{username} — Can't",
-                callback_data=f"decline_{sub_id}_{username}"
-            ),
-        ]
-        for username in added
-    ]
-
-    keyboard = InlineKeyboardMarkup(rows)
-    reviewers_str = " ".join(f"@{u}" for u in added)
+    keyboard = _build_reviewer_prompt_keyboard(sub_id, added)
+    reviewers_str = _mentions(added)
     await bot.send_message(
         chat_id=group_chat_id,
         text=(
@@ -771,7 +927,7 @@ async def handle_override(sub_id: int, new_reviewers: list[str],
     if skipped_existing:
         msg += (
             f" (already assigned, skipped: "
-            f"{', '.join(f'@{u}' for u in skipped_existing)})"
+            f"{_mentions(skipped_existing, ', ')})"
         )
     return msg
 
@@ -780,7 +936,7 @@ async def handle_override(sub_id: int, new_reviewers: list[str],
 
 async def handle_drop(sub_id: int, username: str, bot, config: dict) -> str:
     """Operator removes a single pending reviewer without naming a replacement."""
-    sub = db.get_submission_by_id(sub_id)
+    sub, assignments = await db.run(db.get_submission_with_assignments, sub_id)
     if not sub:
         return f"Submission #{sub_id} not found."
 
@@ -790,7 +946,7 @@ async def handle_drop(sub_id: int, username: str, bot, config: dict) -> str:
             f"while assigning or under review."
         )
 
-    existing = db.get_assignment(sub_id, username)
+    existing = _latest_assignment(assignments, username)
     if not existing:
         return f"@{username} is not assigned to #{sub_id}."
     if existing["status"] != "pending":
@@ -800,11 +956,15 @@ async def handle_drop(sub_id: int, username: str, bot, config: dict) -> str:
             f"a confirmed reviewer."
         )
 
-    deleted = db.delete_pending_assignment(sub_id, username)
-    if not deleted:
+    def _drop():
+        if not db.delete_pending_assignment(sub_id, username):
+            return None
+        return db.get_assignments_for_submission(sub_id)
+
+    remaining = await db.run(_drop)
+    if remaining is None:
         return f"Failed to drop @{username} from #{sub_id}."
 
-    remaining = db.get_assignments_for_submission(sub_id)
     has_pending = any(a["status"] == "pending" for a in remaining)
     has_confirmed = any(a["status"] == "confirmed" for a in remaining)
 
@@ -815,9 +975,10 @@ async def handle_drop(sub_id: int, username: str, bot, config: dict) -> str:
     )
 
     if not has_pending:
-        db.clear_unsent_followups(sub_id, kind="acceptance")
+        await db.run(db.clear_unsent_followups, sub_id, kind="acceptance")
         if has_confirmed and sub["status"] == "assigning":
-            await _transition_to_under_review(sub_id, bot, config)
+            await _transition_to_under_review(sub_id, bot, config,
+                                              from_status="assigning")
             return (
                 f"Dropped @{username}. All remaining reviewers already "
                 f"confirmed — moved to under_review."
@@ -836,48 +997,39 @@ async def handle_drop(sub_id: int, username: str, bot, config: dict) -> str:
 async def send_followup(followup_row, bot, config: dict) -> None:
     sub_id = followup_row["submission_id"]
     kind = followup_row["kind"] if "kind" in followup_row.keys() else "review"
-    sub = db.get_submission_by_id(sub_id)
+    # Acceptance reminders go to reviewers who haven't answered yet; review
+    # check-ins to those who confirmed but aren't done.
+    get_reviewers = (db.get_pending_reviewers if kind == "acceptance"
+                     else db.get_confirmed_reviewers)
+
+    def _load():
+        sub = db.get_submission_by_id(sub_id)
+        return sub, get_reviewers(sub_id) if sub else []
+
+    sub, assignments = await db.run(_load)
     if not sub:
         return
 
     if kind == "acceptance":
-        await _send_acceptance_followup(followup_row, sub, bot, config)
+        await _send_acceptance_followup(followup_row, sub, assignments, bot, config)
     else:
-        await _send_review_followup(followup_row, sub, bot, config)
+        await _send_review_followup(followup_row, sub, assignments, bot, config)
 
 
-async def _send_acceptance_followup(followup_row, sub, bot, config: dict) -> None:
+async def _send_acceptance_followup(followup_row, sub, still_pending,
+                                    bot, config: dict) -> None:
     sub_id = sub["id"]
     if sub["status"] != "assigning":
-        db.mark_followup_sent(followup_row["id"])
+        await db.run(db.mark_followup_sent, followup_row["id"])
         return
 
-    all_assignments = db.get_assignments_for_submission(sub_id)
-    still_pending = [a for a in all_assignments if a["status"] == "pending"]
-
     if not still_pending:
-        db.mark_followup_sent(followup_row["id"])
+        await db.run(db.mark_followup_sent, followup_row["id"])
         return
 
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-    rows = [
-        [
-            InlineKeyboardButton(
-                f"✅ @{a['reviewer_tg_username']} — Yes",
-                callback_data=f"accept_{sub_id}_{a['reviewer_tg_username']}"
-            ),
-            InlineKeyboardButton(
-                f"❌ @{a['reviewer_tg_username']} — Can't",
-                callback_data=f"decline_{sub_id}_{a['reviewer_tg_username']}"
-            ),
-        ]
-        for a in still_pending
-    ]
-    keyboard = InlineKeyboardMarkup(rows)
-
-    reviewers_mention = " ".join(
-        f"@{a['reviewer_tg_username']}" for a in still_pending
-    )
+    reviewers = [a["reviewer_tg_username"] for a in still_pending]
+    keyboard = _build_reviewer_prompt_keyboard(sub_id, reviewers)
+    reviewers_mention = _mentions(reviewers)
     group_chat_id = config["telegram"]["group_chat_id"]
     await bot.send_message(
         chat_id=group_chat_id,
@@ -888,8 +1040,6 @@ async def _send_acceptance_followup(followup_row, sub, bot, config: dict) -> Non
         reply_markup=keyboard,
     )
 
-    db.mark_followup_sent(followup_row["id"])
-
     await notify_operator(
         bot, config,
         f"⏰ Acceptance reminder sent for #{sub_id} 《{sub['title']}》 "
@@ -897,35 +1047,26 @@ async def _send_acceptance_followup(followup_row, sub, bot, config: dict) -> Non
     )
 
     hours = config["workflow"].get("acceptance_followup_interval_hours", 24)
-    next_at = datetime.now(timezone.utc) + timedelta(hours=hours)
-    db.insert_followup(sub_id, next_at, kind="acceptance")
+    await db.run(_mark_sent_and_reschedule, followup_row["id"], sub_id,
+                 hours, "acceptance")
 
 
-async def _send_review_followup(followup_row, sub, bot, config: dict) -> None:
+async def _send_review_followup(followup_row, sub, pending,
+                                bot, config: dict) -> None:
     sub_id = sub["id"]
     if sub["status"] != "under_review":
-        db.mark_followup_sent(followup_row["id"])
+        await db.run(db.mark_followup_sent, followup_row["id"])
         return
 
-    all_assignments = db.get_assignments_for_submission(sub_id)
-    pending = [a for a in all_assignments if a["status"] == "confirmed"]
-
     if not pending:
-        db.mark_followup_sent(followup_row["id"])
+        await db.run(db.mark_followup_sent, followup_row["id"])
         return
 
     reviewers = [a["reviewer_tg_username"] for a in pending]
 
-    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(
-            f"✅ Mark my review as done — @{r}",
-            callback_data=f"done_{sub_id}_{r}"
-        )]
-        for r in reviewers
-    ])
+    keyboard = _build_done_keyboard(sub_id, reviewers)
 
-    reviewers_mention = " ".join(f"@{r}" for r in reviewers)
+    reviewers_mention = _mentions(reviewers)
     group_chat_id = config["telegram"]["group_chat_id"]
     await bot.send_message(
         chat_id=group_chat_id,
@@ -937,8 +1078,6 @@ async def _send_review_followup(followup_row, sub, bot, config: dict) -> None:
         reply_markup=keyboard,
     )
 
-    db.mark_followup_sent(followup_row["id"])
-
     await notify_operator(
         bot, config,
         f"👋 Follow-up sent for #{sub_id} 《{sub['title']}》 "
@@ -946,5 +1085,5 @@ async def _send_review_followup(followup_row, sub, bot, config: dict) -> None:
     )
 
     followup_days = config["workflow"]["followup_interval_days"]
-    next_followup = datetime.now(timezone.utc) + timedelta(days=followup_days)
-    db.insert_followup(sub_id, next_followup, kind="review")
+    await db.run(_mark_sent_and_reschedule, followup_row["id"], sub_id,
+                 followup_days * 24, "review")
@@ -1,7 +1,9 @@
 """
 telegram_handlers.py — All Telegram command and inline button callback handlers.
 """
+import html
 import logging
+import time
 
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -14,6 +16,45 @@ import state
 logger = logging.getLogger(__name__)
 
 
+# Replies shared by several handlers. Templates take their values via
+# str.format so the wording lives in one place.
+MSG_NEED_USERNAME = "You must have a Telegram username to use this command."
+MSG_OPERATOR_ONLY = "Only the operator can use /{}."
+MSG_BAD_SUB_ID = "sub_id must be a number."
+MSG_SUB_NOT_FOUND = "Submission #{} not found."
+MSG_NO_SUB_WITH_ID = "No submission found with ID #{}."
+MSG_NO_MATCH = "No active submission found matching '{}'."
+MSG_NO_CONTENT_REQUEST = "No pending content request for submission #{}."
+
+
+# keyword → (expires_at, matches). /done, /reject and /second are
+# often repeated with the same keyword by several people in a row; a few
+# seconds of staleness is fine for human-issued commands, and state.py
+# re-reads the submission before acting on it. Keyed on the keyword as typed:
+# the short-keyword LIKE path folds ASCII case only, so "ÄB" and "äb" can
+# match different titles.
+_KEYWORD_TTL_SECONDS = 3.0
+_KEYWORD_CACHE_SIZE = 256
+_keyword_cache: dict[str, tuple[float, list]] = {}
+
+
+def _lookup_keyword(keyword: str) -> list:
+    """db.get_submission_by_title_keyword, memoized for _KEYWORD_TTL_SECONDS."""
+    now = time.monotonic()
+    hit = _keyword_cache.get(keyword)
+    if hit and hit[0] > now:
+        return hit[1]
+    matches = db.get_submission_by_title_keyword(keyword)
+    if len(_keyword_cache) >= _KEYWORD_CACHE_SIZE:
+        for k, (exp, _) in list(_keyword_cache.items()):
+            if exp <= now:
+                _keyword_cache.pop(k, None)
+        if len(_keyword_cache) >= _KEYWORD_CACHE_SIZE:
+            _keyword_cache.clear()
+    _keyword_cache[keyword] = (now + _KEYWORD_TTL_SECONDS, matches)
+    return matches
+
+
 def _resolve_submission(arg: str):
     """Resolve a CLI arg to (sub, error_message, ambiguous_matches).
 
@@ -27,180 +68,178 @@ def _resolve_submission(arg: str):
     if id_candidate.isdigit():
         sub = db.get_submission_by_id(int(id_candidate))
         if not sub:
-            return None, f"No submission found with ID #{id_candidate}.", None
+            return None, MSG_NO_SUB_WITH_ID.format(id_candidate), None
         return sub, None, None
 
-    matches = db.get_submission_by_title_keyword(arg)
+    matches = _lookup_keyword(arg)
     if not matches:
-        return None, f"No active submission found matching '{arg}'.", None
+        return None, MSG_NO_MATCH.format(arg), None
     if len(matches) > 1:
         return None, None, matches
     return matches[0], None, None
 
 
-# ── /getid ────────────────────────────────────────────────────────────────────
-
-async def cmd_getid(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    chat_id = update.effective_chat.id
-    user = update.effective_user
-    user_id = user.id if user else "N/A"
-    username = f"@{user.username}" if user and user.username else str(user_id)
-    await update.message.reply_text(
-        f"Chat ID: {chat_id}\nYour user ID: {user_id} ({username})"
-    )
-
+async def _resolve_command_target(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                  command: str, need_reason: bool = False):
+    """Shared front half of /done, /reject and /second.
 
-# ── /status ───────────────────────────────────────────────────────────────────
-
-async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    active = db.get_active_submissions()
-    if not active:
-        await update.message.reply_text("No active submissions right now.")
-        return
-
-    lines = ["Active Submissions:\n"]
-    for sub in active:
-        assignments = db.get_assignments_for_submission(sub["id"])
-        reviewers = ", ".join(
-            f"@{a['reviewer_tg_username']} ({a['status']})"
-            for a in assignments
-        )
-        lines.append(
-            f"#{sub['id']} — 《{sub['title']}》\n"
-            f"Status: {sub['status']}\n"
-            f"Reviewers: {reviewers or 'none'}\n"
-        )
-
-    await update.message.reply_text("\n".join(lines))
-
-
-# ── /done <sub_id|keyword> ────────────────────────────────────────────────────
-
-async def cmd_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    Requires a Telegram username, parses `<sub_id|keyword>` (plus a reason
+    when need_reason) and resolves the submission. Returns (sub, reason);
+    sub is None when an error reply has already been sent.
+    """
     user = update.effective_user
     if not user or not user.username:
+        await update.message.reply_text(MSG_NEED_USERNAME)
+        return None, None
+
+    reason_usage = " <reason>" if need_reason else ""
+    if not context.args or (need_reason and len(context.args) < 2):
         await update.message.reply_text(
-            "You must have a Telegram username to use this command."
+            f"Usage: /{command} <sub_id|keyword>{reason_usage}"
         )
-        return
+        return None, None
 
-    if not context.args:
-        await update.message.reply_text("Usage: /done <sub_id|keyword>")
-        return
+    if need_reason:
+        target, reason = context.args[0], " ".join(context.args[1:])
+    else:
+        target, reason = " ".join(context.args), None
+    target = target.strip().strip('"').strip("'")
 
-    target = " ".join(context.args).strip().strip('"').strip("'")
-
-    sub, err, ambiguous = _resolve_submission(target)
+    sub, err, ambiguous = await db.run(_resolve_submission, target)
     if ambiguous:
-        listing = "\n".join(f"#{s['id']}: 《{s['title']}》" for s in ambiguous)
+        listing = "\n".join([f"#{s['id']}: 《{s['title']}》" for s in ambiguous])
         await update.message.reply_text(
             f"Multiple submissions match '{target}':\n{listing}\n\n"
-            f"Re-run with a sub_id (e.g. /done #{ambiguous[0]['id']})."
+            f"Re-run with a sub_id (e.g. /{command} #{ambiguous[0]['id']}{reason_usage})."
         )
-        return
+        return None, None
     if err:
         await update.message.reply_text(err)
-        return
+        return None, None
+    return sub, reason
 
-    config = cfg.load()
-    answer = await state.handle_reviewer_done(
-        sub_id=sub["id"],
-        username=user.username,
-        tg_user_id=user.id,
-        bot=context.bot,
-        config=config,
-    )
-    await update.message.reply_text(answer)
 
+def _is_operator(user) -> bool:
+    """
+    ACL for operator-only commands, checked before the handler does any other
+    work. Goes through cfg.load()'s cache (which may stat or reparse
+    config.yaml) and compares one id. With no operator configured, everyone
+    is allowed.
+    """
+    operator_user_id = cfg.operator_id()
+    return not operator_user_id or (user is not None and user.id == operator_user_id)
 
-# ── /reject <sub_id|keyword> <reason> ─────────────────────────────────────────
 
-async def cmd_reject(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    user = update.effective_user
-    if not user or not user.username:
-        await update.message.reply_text(
-            "You must have a Telegram username to use this command."
-        )
-        return
+# ── /getid ────────────────────────────────────────────────────────────────────
 
-    if not context.args or len(context.args) < 2:
-        await update.message.reply_text("Usage: /reject <sub_id|keyword> <reason>")
-        return
+async def cmd_getid(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    chat_id = update.effective_chat.id
+    user = update.effective_user
+    user_id = user.id if user else "N/A"
+    username = f"@{user.username}" if user and user.username else str(user_id)
+    await update.message.reply_text(
+        f"Chat ID: {chat_id}\nYour user ID: {user_id} ({username})"
+    )
 
-    target = context.args[0]
-    reason = " ".join(context.args[1:])
 
-    sub, err, ambiguous = _resolve_submission(target)
-    if ambiguous:
-        listing = "\n".join(f"#{s['id']}: 《{s['title']}》" for s in ambiguous)
-        await update.message.reply_text(
-            f"Multiple submissions match '{target}':\n{listing}\n\n"
-            f"Re-run with a sub_id (e.g. /reject #{ambiguous[0]['id']} <reason>)."
-        )
-        return
-    if err:
-        await update.message.reply_text(err)
-        return
+# ── /status ───────────────────────────────────────────────────────────────────
 
-    config = cfg.load()
-    await state.handle_rejection_proposal(
-        sub_id=sub["id"],
-        proposed_by=user.username,
-        reason=reason,
-        bot=context.bot,
-        config=config,
+def _status_entry(sub: dict) -> str:
+    # join() over a list is faster than over a generator: it sizes the
+    # result in one pass instead of materialising the generator first.
+    reviewers = ", ".join([
+        f"@{username} ({status})" for username, status in sub["assignments"]
+    ])
+    return (
+        f"#{sub['id']} — 《{sub['title']}》\n"
+        f"Status: {sub['status']}\n"
+        f"Reviewers: {reviewers or 'none'}\n"
     )
 
 
-# ── /second <sub_id|keyword> ──────────────────────────────────────────────────
+# (db.write_version() when rendered, text). The version is read before the
+# query, so a write that lands mid-query leaves the entry already stale.
+_status_cache: tuple[int, str] | None = None
 
-async def cmd_second(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    user = update.effective_user
-    if not user or not user.username:
-        await update.message.reply_text(
-            "You must have a Telegram username to use this command."
-        )
-        return
 
-    if not context.args:
-        await update.message.reply_text("Usage: /second <sub_id|keyword>")
+async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    global _status_cache
+    version = db.write_version()
+    if _status_cache and _status_cache[0] == version:
+        await update.message.reply_text(_status_cache[1])
         return
 
-    target = " ".join(context.args).strip()
+    active = await db.run(db.get_active_submissions_with_context)
+    if active:
+        text = "\n".join(["Active Submissions:\n", *map(_status_entry, active)])
+    else:
+        text = "No active submissions right now."
+    _status_cache = (version, text)
+    await update.message.reply_text(text)
 
-    sub, err, ambiguous = _resolve_submission(target)
-    if ambiguous:
-        listing = "\n".join(f"#{s['id']}: 《{s['title']}》" for s in ambiguous)
-        await update.message.reply_text(
-            f"Multiple submissions match '{target}':\n{listing}\n\n"
-            f"Re-run with a sub_id (e.g. /second #{ambiguous[0]['id']})."
+
+# ── /done, /second <sub_id|keyword> ──────────────────────────────────────────
+
+def _make_keyword_handler(command: str, state_fn, with_tg_user_id: bool = False):
+    """
+    Build the handler for /<command> <sub_id|keyword>: resolve the submission,
+    hand it to state_fn on behalf of the caller and reply with its answer.
+    """
+    async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        sub, _ = await _resolve_command_target(update, context, command)
+        if not sub:
+            return
+
+        user = update.effective_user
+        extra = {"tg_user_id": user.id} if with_tg_user_id else {}
+        answer = await state.locked(
+            sub["id"], state_fn,
+            sub_id=sub["id"],
+            username=user.username,
+            bot=context.bot,
+            config=cfg.load(),
+            **extra,
         )
-        return
-    if err:
-        await update.message.reply_text(err)
+        await update.message.reply_text(answer)
+
+    handler.__name__ = handler.__qualname__ = f"cmd_{command}"
+    return handler
+
+
+cmd_done = _make_keyword_handler("done", state.handle_reviewer_done,
+                                 with_tg_user_id=True)
+cmd_second = _make_keyword_handler("second", state.handle_second)
+
+
+# ── /reject <sub_id|keyword> <reason> ─────────────────────────────────────────
+
+async def cmd_reject(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    sub, reason = await _resolve_command_target(update, context, "reject",
+                                                need_reason=True)
+    if not sub:
         return
 
     config = cfg.load()
-    answer = await state.handle_second(
+    await state.locked(
+        sub["id"], state.handle_rejection_proposal,
         sub_id=sub["id"],
-        username=user.username,
+        proposed_by=update.effective_user.username,
+        reason=reason,
         bot=context.bot,
         config=config,
     )
-    await update.message.reply_text(answer)
 
 
 # ── /override <sub_id> @user1 @user2 ─────────────────────────────────────────
 
 async def cmd_override(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /override.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("override"))
         return
 
+    config = cfg.load()
+
     if not context.args or len(context.args) < 2:
         await update.message.reply_text(
             "Usage: /override <sub_id> @user1 [@user2]"
@@ -210,13 +249,14 @@ async def cmd_override(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
     # Strip @ from usernames
     new_reviewers = [a.lstrip("@") for a in context.args[1:]]
 
-    answer = await state.handle_override(
+    answer = await state.locked(
+        sub_id, state.handle_override,
         sub_id=sub_id,
         new_reviewers=new_reviewers,
         bot=context.bot,
@@ -229,13 +269,12 @@ async def cmd_override(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 async def cmd_drop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /drop.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("drop"))
         return
 
+    config = cfg.load()
+
     if not context.args or len(context.args) != 2:
         await update.message.reply_text("Usage: /drop <sub_id> @user")
         return
@@ -243,7 +282,7 @@ async def cmd_drop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
     username = context.args[1].lstrip("@").strip()
@@ -251,7 +290,8 @@ async def cmd_drop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("Username is required.")
         return
 
-    answer = await state.handle_drop(
+    answer = await state.locked(
+        sub_id, state.handle_drop,
         sub_id=sub_id,
         username=username,
         bot=context.bot,
@@ -265,13 +305,12 @@ async def cmd_drop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def cmd_reviewers(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show current contents of reviewers.md (operator only)."""
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /reviewers.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("reviewers"))
         return
 
+    config = cfg.load()
+
     path = config.get("reviewers_file", "./reviewers.md")
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -285,17 +324,25 @@ async def cmd_reviewers(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text(f"Failed to read {path}: {e}")
         return
 
-    header = f"📋 {path} ({len(content)} chars)\n\n"
-    # Telegram hard limit is 4096; leave headroom for the header/fences.
+    header = html.escape(f"📋 {path} ({len(content)} chars)\n\n", quote=False)
+    # Telegram hard limit is 4096; leave headroom for the header/tags.
+    # HTML <pre> rather than a legacy-Markdown fence: the file may contain
+    # backticks, which the Markdown parser rejects outright. Escape first and
+    # chunk the escaped text so the limit holds, never cutting an entity.
     chunk_size = 3800
-    body = content or "(empty)"
+    body = html.escape(content or "(empty)", quote=False)
     first = True
-    for i in range(0, len(body), chunk_size):
-        piece = body[i:i + chunk_size]
+    i = 0
+    while i < len(body):
+        cut = i + chunk_size
+        amp = body.rfind("&", max(i, cut - 5), cut)
+        if amp > i and body.find(";", amp, cut) == -1:
+            cut = amp
         prefix = header if first else ""
-        await update.message.reply_text(f"{prefix}```\n{piece}\n```",
-                                        parse_mode="Markdown")
+        await update.message.reply_text(f"{prefix}<pre>{body[i:cut]}</pre>",
+                                        parse_mode="HTML")
         first = False
+        i = cut
 
 
 def _reviewers_path(config: dict) -> str:
@@ -305,12 +352,12 @@ def _reviewers_path(config: dict) -> str:
 async def cmd_add_reviewer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Operator: /add_reviewer <category_keyword> <@username>"""
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /add_reviewer.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("add_reviewer"))
         return
 
+    config = cfg.load()
+
     if not context.args or len(context.args) < 2:
         await update.message.reply_text(
             "Usage: /add_reviewer <category_keyword> <@username>\n"
@@ -351,12 +398,12 @@ async def cmd_add_reviewer(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def cmd_remove_reviewer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Operator: /remove_reviewer <@username> — removes from all categories."""
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /remove_reviewer.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("remove_reviewer"))
         return
 
+    config = cfg.load()
+
     if not context.args or len(context.args) != 1:
         await update.message.reply_text("Usage: /remove_reviewer <@username>")
         return
@@ -393,12 +440,12 @@ async def cmd_remove_reviewer(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def cmd_list_categories(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Operator: /list_categories — show category headings for /add_reviewer."""
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /list_categories.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("list_categories"))
         return
 
+    config = cfg.load()
+
     path = _reviewers_path(config)
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -419,11 +466,8 @@ async def cmd_list_categories(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def cmd_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /content.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("content"))
         return
 
     if not context.args or len(context.args) < 2:
@@ -433,7 +477,7 @@ async def cmd_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
     article_content = " ".join(context.args[1:]).strip()
@@ -441,26 +485,25 @@ async def cmd_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         await update.message.reply_text("Article content cannot be empty.")
         return
 
-    sub = db.get_submission_by_id(sub_id)
-    if not sub:
-        await update.message.reply_text(f"Submission #{sub_id} not found.")
+    exists, status, has_request, title = await db.run(
+        db.get_submission_content_state, sub_id
+    )
+    if not exists:
+        await update.message.reply_text(MSG_SUB_NOT_FOUND.format(sub_id))
         return
 
-    if sub["status"] != "pending_content":
-        await update.message.reply_text(
-            f"No pending content request for submission #{sub_id}."
-        )
+    if status != "pending_content" or not has_request:
+        await update.message.reply_text(MSG_NO_CONTENT_REQUEST.format(sub_id))
         return
 
-    if not db.has_content_request(sub_id):
-        await update.message.reply_text(
-            f"No pending content request for submission #{sub_id}."
-        )
+    total_len = await db.run(db.append_content_request_text, sub_id, article_content)
+    if not total_len:
+        # The request timed out or was skipped since the check above.
+        await update.message.reply_text(MSG_NO_CONTENT_REQUEST.format(sub_id))
         return
 
-    total_len = db.append_content_request_text(sub_id, article_content)
     await update.message.reply_text(
-        f"📝 Appended {len(article_content)} chars to 《{sub['title']}》 "
+        f"📝 Appended {len(article_content)} chars to 《{title}》 "
         f"(total: {total_len}).\n\n"
         f"Send more with /content {sub_id} <text> or finalize with "
         f"/content_done {sub_id}."
@@ -471,13 +514,12 @@ async def cmd_content(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
 
 async def cmd_content_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /content_done.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("content_done"))
         return
 
+    config = cfg.load()
+
     if not context.args:
         await update.message.reply_text("Usage: /content_done <sub_id>")
         return
@@ -485,17 +527,15 @@ async def cmd_content_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub or sub["status"] != "pending_content":
-        await update.message.reply_text(
-            f"No pending content request for submission #{sub_id}."
-        )
+        await update.message.reply_text(MSG_NO_CONTENT_REQUEST.format(sub_id))
         return
 
-    article_content = db.get_content_request_text(sub_id)
+    article_content = await db.run(db.get_content_request_text, sub_id)
     if not article_content:
         await update.message.reply_text(
             f"No content buffered for #{sub_id}. Use /content first, "
@@ -507,20 +547,20 @@ async def cmd_content_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         f"✅ Finalizing content for 《{sub['title']}》 "
         f"({len(article_content)} chars). Assigning reviewers…"
     )
-    await state.handle_content_provided(sub_id, article_content, context.bot, config)
+    await state.locked(sub_id, state.handle_content_provided,
+                       sub_id, article_content, context.bot, config)
 
 
 # ── /skip <sub_id> ────────────────────────────────────────────────────────────
 
 async def cmd_skip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /skip.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("skip"))
         return
 
+    config = cfg.load()
+
     if not context.args:
         await update.message.reply_text("Usage: /skip <sub_id>")
         return
@@ -528,30 +568,25 @@ async def cmd_skip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
-        return
-
-    sub = db.get_submission_by_id(sub_id)
-    if not sub:
-        await update.message.reply_text(f"Submission #{sub_id} not found.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
-    if sub["status"] != "pending_content":
-        await update.message.reply_text(
-            f"No pending content request for submission #{sub_id}."
-        )
+    exists, status, has_request, title = await db.run(
+        db.get_submission_content_state, sub_id
+    )
+    if not exists:
+        await update.message.reply_text(MSG_SUB_NOT_FOUND.format(sub_id))
         return
 
-    if not db.has_content_request(sub_id):
-        await update.message.reply_text(
-            f"No pending content request for submission #{sub_id}."
-        )
+    if status != "pending_content" or not has_request:
+        await update.message.reply_text(MSG_NO_CONTENT_REQUEST.format(sub_id))
         return
 
     await update.message.reply_text(
-        f"⏭ Skipped content for 《{sub['title']}》. Assigning reviewers based on title…"
+        f"⏭ Skipped content for 《{title}》. Assigning reviewers based on title…"
     )
-    await state.handle_content_provided(sub_id, "", context.bot, config)
+    await state.locked(sub_id, state.handle_content_provided,
+                       sub_id, "", context.bot, config)
 
 
 # ── /omit <sub_id> [reason] ───────────────────────────────────────────────────
@@ -564,11 +599,8 @@ async def cmd_omit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     bot is running in testing mode, or vice versa).
     """
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /omit.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("omit"))
         return
 
     if not context.args:
@@ -578,14 +610,14 @@ async def cmd_omit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         sub_id = int(context.args[0])
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
     reason = " ".join(context.args[1:]).strip()
 
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub:
-        await update.message.reply_text(f"Submission #{sub_id} not found.")
+        await update.message.reply_text(MSG_SUB_NOT_FOUND.format(sub_id))
         return
 
     if sub["status"] in ("accepted", "rejected", "omitted"):
@@ -594,9 +626,13 @@ async def cmd_omit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
         return
 
-    if db.has_content_request(sub_id):
-        db.delete_content_request(sub_id)
-    db.update_submission_status(sub_id, "omitted")
+    def _omit():
+        # Deleting a missing content request is a no-op, so no existence probe.
+        with db.transaction() as conn:
+            db.delete_content_request_on(conn, sub_id)
+            db.update_submission_status_on(conn, sub_id, "omitted")
+
+    await db.run(_omit)
 
     suffix = f" — {reason}" if reason else ""
     await update.message.reply_text(
@@ -616,11 +652,8 @@ async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
     user = update.effective_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-
-    if operator_user_id and (not user or user.id != operator_user_id):
-        await update.message.reply_text("Only the operator can use /delete.")
+    if not _is_operator(user):
+        await update.message.reply_text(MSG_OPERATOR_ONLY.format("delete"))
         return
 
     if not context.args:
@@ -630,12 +663,12 @@ async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     try:
         sub_id = int(context.args[0].lstrip("#"))
     except ValueError:
-        await update.message.reply_text("sub_id must be a number.")
+        await update.message.reply_text(MSG_BAD_SUB_ID)
         return
 
-    sub = db.get_submission_by_id(sub_id)
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub:
-        await update.message.reply_text(f"Submission #{sub_id} not found.")
+        await update.message.reply_text(MSG_SUB_NOT_FOUND.format(sub_id))
         return
 
     keyboard = InlineKeyboardMarkup([[
@@ -652,99 +685,54 @@ async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     )
 
 
-# ── Button: accept_<sub_id>_<username> ───────────────────────────────────────
-
-async def cb_accept(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
+# ── Buttons: accept_ / decline_ / done_<sub_id>_<username> ──────────────────
 
-    parts = query.data.split("_", 2)  # accept / sub_id / username
-    if len(parts) != 3:
-        await query.answer()
-        return
+# action → (state handler, toast shown right away)
+_REVIEWER_BUTTON_ACTIONS = {
+    "accept": (state.handle_reviewer_accept, "✅ Confirmed! Thank you."),
+    "decline": (state.handle_reviewer_decline, "Noted. Looking for a replacement."),
+    "done": (state.handle_reviewer_done, "✅ Review marked as done!"),
+}
 
-    _, sub_id_str, target_username = parts
-    sub_id = int(sub_id_str)
 
-    user = query.from_user
-    if not user.username or user.username.lower() != target_username.lower():
-        await query.answer(
-            "This button is for @" + target_username + " only.", show_alert=True
-        )
-        return
-
-    # Answer immediately — Telegram requires a response within 30 seconds.
-    # The detailed result is posted to the group chat by state.py.
-    await query.answer("✅ Confirmed! Thank you.")
-    config = cfg.load()
-    await state.handle_reviewer_accept(
-        sub_id=sub_id,
-        username=target_username,
-        tg_user_id=user.id,
-        bot=context.bot,
-        config=config,
-    )
-
-
-# ── Button: decline_<sub_id>_<username> ──────────────────────────────────────
-
-async def cb_decline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-
-    parts = query.data.split("_", 2)
-    if len(parts) != 3:
-        await query.answer()
-        return
-
-    _, sub_id_str, target_username = parts
-    sub_id = int(sub_id_str)
-
-    user = query.from_user
-    if not user.username or user.username.lower() != target_username.lower():
-        await query.answer(
-            "This button is for @" + target_username + " only.", show_alert=True
-        )
-        return
-
-    await query.answer("Noted. Looking for a replacement.")
-    config = cfg.load()
-    await state.handle_reviewer_decline(
-        sub_id=sub_id,
-        username=target_username,
-        tg_user_id=user.id,
-        bot=context.bot,
-        config=config,
-    )
-
-
-# ── Button: done_<sub_id>_<username> ─────────────────────────────────────────
-
-async def cb_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def cb_reviewer_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
 
-    parts = query.data.split("_", 2)
-    if len(parts) != 3:
+    parsed = state.parse_reviewer_callback(query.data)
+    if parsed is None:
         await query.answer()
         return
 
-    _, sub_id_str, target_username = parts
-    sub_id = int(sub_id_str)
+    action, sub_id, target_username = parsed
 
     user = query.from_user
-    if not user.username or user.username.lower() != target_username.lower():
+    # Keyboards emit target_username lower-cased; the second comparison only
+    # runs for buttons posted before that, which may still carry mixed case.
+    username = user.username.lower() if user.username else None
+    if username is None or (
+        username != target_username and username != target_username.lower()
+    ):
         await query.answer(
             "This button is for @" + target_username + " only.", show_alert=True
         )
         return
 
-    await query.answer("✅ Review marked as done!")
+    handler, toast = _REVIEWER_BUTTON_ACTIONS[action]
+    # Answer immediately — Telegram requires a response within 30 seconds.
+    # The detailed result is posted to the group chat by state.py, in a task
+    # of its own so PTB can move on to the next update meanwhile; failures
+    # reach the application's error handler. state.locked() keeps tasks for
+    # the same submission from interleaving.
+    await query.answer(toast)
     config = cfg.load()
-    await state.handle_reviewer_done(
+    context.application.create_task(state.locked(
+        sub_id, handler,
         sub_id=sub_id,
         username=target_username,
         tg_user_id=user.id,
         bot=context.bot,
         config=config,
-    )
+    ), update=update)
 
 
 # ── Button: confirm_rejection_<sub_id> ───────────────────────────────────────
@@ -752,30 +740,28 @@ async def cb_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def cb_confirm_rejection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
 
-    parts = query.data.split("_", 2)  # confirm / rejection / sub_id
     # callback_data format: confirm_rejection_<sub_id>
-    # Split on first two underscores: ["confirm", "rejection", "<sub_id>"]
-    data_parts = query.data.split("_")
-    if len(data_parts) < 3:
+    parts = query.data.split("_")
+    if len(parts) < 3:
         await query.answer()
         return
 
-    sub_id = int(data_parts[-1])
+    sub_id = int(parts[-1])
     user = query.from_user
-    config = cfg.load()
-
-    operator_user_id = config["telegram"].get("operator_user_id")
-    if operator_user_id and user.id != operator_user_id:
+    if not _is_operator(user):
         await query.answer("Only the operator can confirm rejection.", show_alert=True)
         return
 
+    config = cfg.load()
+
     await query.answer("🚫 Rejection confirmed.")
-    await state.handle_confirm_rejection(
+    context.application.create_task(state.locked(
+        sub_id, state.handle_confirm_rejection,
         sub_id=sub_id,
         operator_tg_id=user.id,
         bot=context.bot,
         config=config,
-    )
+    ), update=update)
 
 
 # ── Button: confirm_delete_<sub_id> ──────────────────────────────────────────
@@ -796,13 +782,13 @@ async def cb_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     user = query.from_user
-    config = cfg.load()
-    operator_user_id = config["telegram"].get("operator_user_id")
-    if operator_user_id and user.id != operator_user_id:
+    if not _is_operator(user):
         await query.answer("Only the operator can confirm deletion.", show_alert=True)
         return
 
-    sub = db.get_submission_by_id(sub_id)
+    config = cfg.load()
+
+    sub = await db.run(db.get_submission_by_id, sub_id)
     if not sub:
         await query.answer("Already deleted.", show_alert=True)
         try:
@@ -813,21 +799,27 @@ async def cb_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     title = sub["title"]
 
-    # Rewind the Gmail watermark so the next poll re-ingests this email.
-    created_at = sub["created_at"]
-    if created_at:
-        try:
-            dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=timezone.utc
-            )
-            target_ts = dt.timestamp() - 60  # 1 minute buffer
-            current = db.get_state("last_gmail_checked_ts")
-            if current is None or float(current) > target_ts:
-                db.set_state("last_gmail_checked_ts", str(target_ts))
-        except ValueError:
-            logger.warning("Could not parse created_at=%r for sub #%d", created_at, sub_id)
-
-    db.delete_submission(sub_id)
+    def _delete():
+        # Rewind the Gmail watermark so the next poll re-ingests this email.
+        created_at = sub["created_at"]
+        if created_at:
+            try:
+                dt = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").replace(
+                    tzinfo=timezone.utc
+                )
+                target_ts = dt.timestamp() - 60  # 1 minute buffer
+                current = db.get_state("last_gmail_checked_ts")
+                if current is None or float(current) > target_ts:
+                    db.set_state("last_gmail_checked_ts", str(target_ts))
+            except ValueError:
+                logger.warning("Could not parse created_at=%r for sub #%d", created_at, sub_id)
+        # The history cursor only ever moves forward, so drop it to make the next
+        # poll use the (rewound) timestamp search instead.
+        db.delete_state("last_gmail_history_id")
+
+        db.delete_submission(sub_id)
+
+    await db.run(_delete)
 
     await query.answer("🗑 Deleted.")
     try: